@@ -0,0 +1,94 @@
+#!/usr/bin/env python3.10
+r"""
+Compare the context-free grammars that EBNF grammars are desugared into, with and without
+shared variables for repeated sub-expressions: rules, LR(0) states and LALR construction time
+
+Usage:
+    python -m benchmarks.ebnf_desugaring
+"""
+from functools import cached_property
+from pathlib import Path
+from time import monotonic as time
+from ebnf import EBNF
+from grammar import Grammar
+from libs.set_utils import add_to_set
+
+STATEMENTS = """
+program = { statement } ;
+statement = "let", name, [ ":", type ], "=", expression, ";"
+          | "if", expression, block, { "elif", expression, block }, [ "else", block ]
+          | "while", expression, block
+          | "return", [ expression ], ";"
+          | expression, ";" ;
+block = "{", { statement }, "}" ;
+type = name, [ "<", type, { ",", type }, ">" ] ;
+expression = term, { ( "+" | "-" ), term } ;
+term = factor, { ( "*" | "/" ), factor } ;
+factor = number | name, [ "(", [ expression, { ",", expression } ], ")" ]
+       | "(", expression, ")" | "[", [ expression, { ",", expression } ], "]" ;
+name = ?[a-z]+? ;
+number = ?\\d+? ;
+"""
+
+
+class ExpandingEBNF(EBNF):
+    # the old desugaring that expands every sub-expression where it appears, kept as a baseline
+
+    @cached_property
+    def parsing_rules(self):
+        rules, used_names = {}, set(self.symbols)
+
+        def dfs(head, body):
+            nonlocal used_names
+            used_names.add(head)
+            if body in used_names:
+                body = ("cat", body)
+            args = tuple(
+                str(arg) if str(arg) in used_names else dfs(str(arg), arg) for arg in body[1:]
+            )
+            if body[0] == "alt":
+                _ = [dfs(head, expr) for expr in body[1:]]
+            elif body[0] == "cat":
+                rules[head, args] = lambda *x, head=head: (head, *x)
+            elif body[0] == "opt":
+                return dfs(head, ("alt", args[0], ("cat",)))
+            elif body[0] == "rep":
+                arg = args[0]
+                arg_repeated = add_to_set(used_names, str(arg) + " repeated")
+                dfs(arg_repeated, ("opt", ("cat", arg_repeated, arg)))
+                return dfs(head, ("cat", arg_repeated))
+            return head
+
+        for head, expr in (
+            (head, expr)
+            for head, alts in self.rules.items()
+            for expr in (alts[1:] if alts[0] == "alt" else [alts])
+        ):
+            old_rules, rules = rules, {}
+            dfs(head, expr)
+            rules = old_rules | dict(reversed(rules.items()))
+        return rules
+
+
+def measure(grammar: EBNF) -> tuple[int, int, float]:
+    t0 = time()
+    actions, gotos = Grammar(grammar.parsing_rules).construct_glr_parsing_table()
+    seconds = time() - t0
+    states = 1 + max(state for state, _ in [*actions, *gotos])
+    return len(grammar.parsing_rules), states, seconds
+
+
+def main():
+    texts = {
+        "ebnf.ebnf": Path(__file__).parent.parent.joinpath("ebnf.ebnf").read_text(),
+        "statements": STATEMENTS,
+    }
+    print(f"{'grammar':>12} {'desugaring':>10} {'rules':>6} {'states':>7} {'seconds':>8}")
+    for name, text in texts.items():
+        for desugaring, ebnf in (("expanding", ExpandingEBNF), ("shared", EBNF)):
+            rules, states, seconds = measure(ebnf(text))
+            print(f"{name:>12} {desugaring:>10} {rules:>6} {states:>7} {seconds:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
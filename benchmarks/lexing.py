@@ -0,0 +1,82 @@
+#!/usr/bin/env python3.10
+r"""
+Measure lexer throughput on the grammar from ebnf.ebnf and on EBNF sources, and the memory
+held by the tokens of the grammar lexer as tuples and as token arrays
+
+Usage:
+    python -m benchmarks.lexing [SIZES...]
+
+Arguments:
+    SIZES          Numbers of copies of ebnf.ebnf in the generated inputs
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+from time import monotonic as time
+from ebnf import EBNF, ebnf_token_patterns
+from lexer import compile_patterns, construct_array_lexer, construct_lexer
+
+
+def baseline_lexer(patterns):
+    # the old lexer that tries every pattern in order at every position
+    recognizers = compile_patterns(patterns)
+
+    def scan(source: str, i: int = 0):
+        while i < len(source):
+            for regex, postprocessing in recognizers:
+                if match := regex.match(source, i):
+                    if postprocessing is not None:
+                        yield postprocessing(match.span(), match.group())
+                    i = match.end()
+                    break
+            else:
+                raise ValueError(f"Unexpected character: {repr(source[i])}")
+    return scan
+
+
+def measure(scan, source: str) -> tuple[int, float]:
+    t0 = time()
+    tokens = sum(1 for _ in scan(source))
+    return tokens, tokens / (time() - t0)
+
+
+def held_memory(scan, source: str) -> int:
+    tracemalloc.start()
+    tokens = scan(source)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+    return size
+
+
+def main(sizes: list[int]):
+    text = Path(__file__).parent.parent.joinpath("ebnf.ebnf").read_text()
+    grammar = EBNF(text)
+    grammar_patterns = grammar.token_patterns
+    inputs = {
+        # the terminals of ebnf.ebnf are single characters, so every character is a token
+        f"ebnf.ebnf terminals ({len(grammar_patterns)} patterns)":
+            (grammar_patterns, "".join(text.split())),
+        f"EBNF syntax ({len(ebnf_token_patterns)} patterns)": (ebnf_token_patterns, text),
+    }
+    print(f"{'input':>40} {'tokens':>8} {'baseline tok/s':>16} {'combined tok/s':>16}")
+    for name, (patterns, source) in inputs.items():
+        for n in sizes or [10, 100]:
+            tokens, old = measure(baseline_lexer(patterns), source * n)
+            _, new = measure(construct_lexer(patterns), source * n)
+            print(f"{name:>40} {tokens:>8} {old:>16,.0f} {new:>16,.0f}")
+    scan_tuples = construct_lexer(grammar_patterns)
+    scan_array = construct_array_lexer(grammar.token_types, grammar.token_values)
+    source = "".join(text.split())
+    print(f"\n{'tokens':>8} {'array tok/s':>16} {'tuples bytes':>16} {'array bytes':>16}")
+    for n in sizes or [10, 100]:
+        t0 = time()
+        tokens = len(scan_array(source * n))
+        speed = tokens / (time() - t0)
+        tuples_size = held_memory(lambda s: list(scan_tuples(s)), source * n)
+        array_size = held_memory(scan_array, source * n)
+        print(f"{tokens:>8} {speed:>16,.0f} {tuples_size:>16,} {array_size:>16,}")
+
+
+if __name__ == "__main__":
+    main(list(map(int, sys.argv[1:])))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.10
+r"""
+Measure LR driver throughput in tokens per second on large inputs
+
+Usage:
+    python -m benchmarks.lr_parsing [flat | nested] [SIZES...]
+
+Arguments:
+    SIZES          Numbers of operands or nesting levels of generated inputs
+"""
+import sys
+from itertools import chain
+from time import monotonic as time
+from types import ModuleType
+from clr_parser import integer_tables, parse, parse_compact
+from codegen import generate_parser_module
+from compact_table import CompactTable
+from glr_parser import deterministic_table, parse as parse_glr
+from grammar import Grammar
+
+RULES = {
+    ("sum", ("product",)): (lambda x: x),
+    ("sum", ("sum", "+", "product")): (lambda x, _, y: x + y),
+    ("product", ("factor",)): (lambda x: x),
+    ("product", ("product", "*", "factor")): (lambda x, _, y: x * y),
+    ("factor", ("(", "sum", ")")): (lambda _, x, __: x),
+    ("factor", ("number",)): (lambda x: x),
+}
+
+
+def flat_input(operands: int) -> list[tuple[str, int | str]]:
+    tokens = [("number", 1)]
+    for i in range(1, operands):
+        tokens += [("+" if i % 2 else "*", None), ("number", 1)]
+    return tokens
+
+
+def nested_input(levels: int) -> list[tuple[str, int | str]]:
+    return [("(", "(")] * levels + [("number", 1)] + [(")", ")")] * levels
+
+
+INPUTS = {
+    "flat": (flat_input, [10000, 100000]),
+    "nested": (nested_input, [1000, 10000]),
+}
+
+
+def baseline_parse(action_table, goto_table, postprocessings, source):
+    # the old driver that matches tuple actions and copies the stack on every reduction
+    tokens = chain(iter(source), [(None, None)])
+    stack = [0]
+    token_type, next_token = next(tokens)
+    while True:
+        match action_table.get((stack[-1], token_type), "error"):
+            case "error":
+                raise ValueError("Unexpected token: " + repr(token_type))
+            case ("shift", j):
+                stack.append(next_token)
+                stack.append(j)
+                token_type, next_token = next(tokens)
+            case ("reduce", rule):
+                f = postprocessings.get(rule, lambda *x: (rule.head, *x))
+                stack, body = stack[: -len(rule.body) * 2], stack[-len(rule.body)*2::2]
+                state = goto_table[stack[-1], rule.head]
+                stack.append(f(*body))
+                stack.append(state)
+            case ("accept",):
+                return stack[1]
+
+
+def measure(parse, source) -> float:
+    t0 = time()
+    parse(source)
+    return len(source) / (time() - t0)
+
+
+def main(kind: str, sizes: list[int]):
+    get_input, default_sizes = INPUTS[kind]
+    actions, gotos = Grammar(RULES).construct_lalr_parsing_table()
+    glr_actions, glr_gotos = Grammar(RULES).construct_glr_parsing_table()
+    table, rows = CompactTable(actions, gotos), integer_tables(actions, gotos)
+    glr_table = deterministic_table(glr_actions, glr_gotos)
+    generated = ModuleType("generated_parser")
+    exec(generate_parser_module(actions, gotos), generated.__dict__)
+    drivers = {
+        "baseline": lambda source: baseline_parse(actions, gotos, RULES, source),
+        "parse": lambda source: parse(rows, None, RULES, source),
+        "compact": lambda source: parse_compact(table, RULES, source),
+        "generated": generated.parser(RULES),
+        "glr": lambda source: parse_glr(
+            glr_actions, glr_gotos, RULES, source, table=glr_table
+        ),
+    }
+    print(f"{'tokens':>8} " + " ".join(f"{name + ' tok/s':>16}" for name in drivers))
+    for n in sizes or default_sizes:
+        source = get_input(n)
+        speeds = [measure(driver, source) for driver in drivers.values()]
+        print(f"{len(source):>8} " + " ".join(f"{speed:>16,.0f}" for speed in speeds))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    kind = args.pop(0) if args and args[0] in INPUTS else "flat"
+    main(kind, list(map(int, args)))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3.10
+r"""
+Measure LR table generation time on synthetic grammars of growing size
+
+Usage:
+    python -m benchmarks.lr_tables [precedence | keywords] [SIZES...]
+
+Arguments:
+    SIZES          Numbers of precedence levels or keywords of generated grammars
+"""
+import sys
+from functools import cached_property, reduce
+from time import monotonic as time
+from grammar import Grammar
+
+
+def precedence_grammar(levels: int) -> list[tuple[str, tuple[str, ...]]]:
+    rules = []
+    for i in range(levels):
+        rules.append((f"expr{i}", (f"expr{i}", f"op{i}", f"expr{i+1}")))
+        rules.append((f"expr{i}", (f"expr{i+1}",)))
+    rules.append((f"expr{levels}", ("(", "expr0", ")")))
+    rules.append((f"expr{levels}", ("id",)))
+    return rules
+
+
+def keywords_grammar(keywords: int) -> list[tuple[str, tuple[str, ...]]]:
+    rules = [("statements", ("statements", "statement")), ("statements", ("statement",))]
+    for i in range(keywords):
+        rules.append(("statement", (f"keyword{i}", "arguments", ";")))
+    rules.append(("arguments", ("arguments", ",", "id")))
+    rules.append(("arguments", ("id",)))
+    return rules
+
+
+GRAMMARS = {
+    "precedence": (precedence_grammar, [4, 8, 16]),
+    "keywords": (keywords_grammar, [50, 100, 200]),
+}
+
+
+class FixpointGrammar(Grammar):
+    # FIRST/FOLLOW sets and closures computed with the old fixpoint loops, kept as a baseline
+
+    @cached_property
+    def prefixes(self):
+        prefixes = {s: set([s] if s in self.terminals else []) for s in self.symbols}
+
+        def get_prefixes(body):
+            if len(body) == 0:
+                return set([None])
+            if None not in prefixes[body[0]]:
+                return prefixes[body[0]]
+            return prefixes[body[0]] - {None} | get_prefixes(body[1:])
+
+        done = False
+        while not done:
+            done = True
+            for head, body in self.rules:
+                for first in filter(lambda f: f not in prefixes[head], get_prefixes(body)):
+                    prefixes[head].add(first)
+                    done = False
+        return prefixes
+
+    @cached_property
+    def followers(self):
+        followers = {v: set([]) for v in self.symbols}
+        followers[self.start].add(None)
+        done = False
+        while not done:
+            done = True
+            for head, body in self.rules:
+                current_followers = followers[head]
+                for symbol in reversed(body):
+                    for follower in current_followers:
+                        if follower not in followers[symbol]:
+                            done = False
+                            followers[symbol].add(follower)
+                    current_followers = (
+                        self.prefixes[symbol] - {None} | current_followers
+                        if None in self.prefixes[symbol]
+                        else self.prefixes[symbol]
+                    )
+        return followers
+
+    def lr0_closure(self, core_items):
+        item_set = set(core_items)
+        done = False
+        while not done:
+            done = True
+            for item_rule, i, _ in map(self.item_parts, list(item_set)):
+                if i == len(item_rule.body) or item_rule.body[i] not in self.variables:
+                    continue
+                next_symbol = item_rule.body[i]
+                for k, rule in enumerate(self.item_rules):
+                    if rule.head == next_symbol and self.item(k) not in item_set:
+                        item_set.add(self.item(k))
+                        done = False
+        return item_set
+
+    def lr1_closure(self, core_items):
+        item_set = set(core_items)
+        done = False
+        while not done:
+            done = True
+            for item_rule, i, follower in map(self.item_parts, list(item_set)):
+                if i == len(item_rule.body) or item_rule.body[i] not in self.variables:
+                    continue
+                next_symbol = item_rule.body[i]
+                for k, rule in enumerate(self.item_rules):
+                    if rule.head != next_symbol:
+                        continue
+                    followers = reduce(
+                        lambda x, y: y - {None} | x if None in y else y,
+                        map(self.prefixes.get, reversed(item_rule.body[i+1:])), {follower}
+                    )
+                    for new_item in (self.item(k, 0, symbol) for symbol in followers):
+                        if new_item not in item_set:
+                            item_set.add(new_item)
+                            done = False
+        return item_set
+
+
+def measure(grammar: Grammar, algorithm: str) -> float:
+    t0 = time()
+    if algorithm == "first/follow":
+        grammar.followers
+    else:
+        getattr(grammar, f"construct_{algorithm}_parsing_table")()
+    return time() - t0
+
+
+def main(family: str, sizes: list[int]):
+    get_rules, default_sizes = GRAMMARS[family]
+    print(f"{'rules':>6} {'algorithm':>12} {'fixpoint':>12} {'worklist':>12} {'speedup':>8}")
+    for n in sizes or default_sizes:
+        rules = get_rules(n)
+        for algorithm in ("first/follow", "slr", "lalr", "clr"):
+            old = measure(FixpointGrammar(rules), algorithm)
+            new = measure(Grammar(rules), algorithm)
+            print(f"{len(rules):>6} {algorithm:>12} {old:>12.4f} {new:>12.4f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    family = args.pop(0) if args and args[0] in GRAMMARS else "precedence"
+    main(family, list(map(int, args)))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3.10
+r"""
+Measure the time to scan a generated file in worker processes
+
+Usage:
+    python -m benchmarks.parallel_lexing [LINES] [PROCESSES...]
+
+Arguments:
+    LINES          Number of lines of the generated file
+    PROCESSES      Numbers of worker processes to compare, 1 scans without workers
+"""
+import os
+import sys
+from pathlib import Path
+from re import compile as re
+from tempfile import TemporaryDirectory
+from time import monotonic as time
+from parallel_lexer import scan_file
+
+PATTERNS = {
+    re(r"\s+"): None,
+    re(r'"[^"]*"'): "string",
+    re(r"#[^\n]*"): "comment",
+    re(r"\d+"): "number",
+    re(r"\w+"): "name",
+    re(r"[-=+*/()]"): "operator",
+}
+
+
+def main(lines: int, processes: list[int]):
+    with TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("source.txt")
+        path.write_text('total = (x + 12) * "a\nb" # sum\n' * lines)
+        print(f"{'processes':>10} {'tokens':>10} {'seconds':>10}")
+        for n in processes or [1, os.cpu_count()]:
+            t0 = time()
+            tokens = scan_file(PATTERNS, path, processes=n)
+            print(f"{n:>10} {len(tokens):>10} {time() - t0:>10.2f}")
+
+
+if __name__ == "__main__":
+    args = list(map(int, sys.argv[1:]))
+    main(args.pop(0) if args else 1000000, args)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3.10
+r"""
+Compare Syntax.parse with EBNF.parse on the bundled arithmetic grammar or on a larger grammar
+of C-like expressions: characters per second and the memory held by the parse trees
+
+Usage:
+    python -m benchmarks.syntax_parsing [arithmetic | expressions] [SIZES...]
+
+Arguments:
+    SIZES          Numbers of repetitions of a small expression in the generated inputs
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+from time import monotonic as time
+from ebnf import EBNF
+
+# the special sequences of the bundled grammar are descriptions, not regular expressions
+SPECIAL_SEQUENCES = {"? chars ?": r"?[a-z]+?", "? digits ?": r"?\d+?"}
+
+# twelve levels of operators, no operator is a prefix of another one because the lexer of
+# EBNF.parse takes the first pattern that matches and not the longest
+EXPRESSIONS = r"""
+expression = conjunction | expression, "||", conjunction;
+conjunction = bits | conjunction, "&&", bits;
+bits = equality | bits, "^", equality;
+equality = comparison | equality, "==", comparison | equality, "!=", comparison;
+comparison = shift | comparison, "<=", shift | comparison, ">=", shift;
+shift = sum | shift, "<<", sum | shift, ">>", sum;
+sum = product | sum, "+", product | sum, "-", product;
+product = unary | product, "*", unary | product, "/", unary | product, "%", unary;
+unary = postfix | "-", unary | "~", unary;
+postfix = primary | postfix, "(", [arguments], ")" | postfix, "[", expression, "]"
+        | postfix, ".", identifier;
+arguments = expression, {",", expression};
+primary = identifier | number | "(", expression, ")";
+identifier = ?[a-z_]+?;
+number = ?\d+?;
+"""
+
+
+def arithmetic_grammar() -> EBNF:
+    text = Path(__file__).parent.parent.joinpath("simple_arithmetic_expression.ebnf").read_text()
+    for description, regex in SPECIAL_SEQUENCES.items():
+        text = text.replace(description, regex)
+    return EBNF(text)
+
+
+GRAMMARS = {
+    "arithmetic": (arithmetic_grammar, "sum", "+", "(12+x)*3-y/45", [1000, 10000]),
+    "expressions": (
+        lambda: EBNF(EXPRESSIONS), "expression", "||",
+        "f(a,b[1])+x.y*-3<<2<=(c%4)&&~d!=e^g>=k(m)>>1==n-5/o", [100, 1000],
+    ),
+}
+
+
+def measure(parse, source: str) -> tuple[float, int]:
+    # tracing allocations slows parsing down, so the speed is measured in a separate run
+    t0 = time()
+    parse(source)
+    speed = len(source) / (time() - t0)
+    tracemalloc.start()
+    tree = parse(source)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return speed, size
+
+
+def main(name: str, sizes: list[int]):
+    make_grammar, root, separator, expression, default_sizes = GRAMMARS[name]
+    grammar = make_grammar()
+    syntax = grammar.syntax()
+    parsers = {
+        "EBNF.parse": grammar.parse,
+        "Syntax.parse": lambda source: syntax.parse(source, root),
+    }
+    for parse in parsers.values():
+        parse("1")  # builds or loads the tables
+    columns = (f"{name + ' chars/s':>20} {'tree bytes':>12}" for name in parsers)
+    print(f"{'chars':>8} " + " ".join(columns))
+    for n in sizes or default_sizes:
+        source = separator.join([expression] * n)
+        results = [measure(parse, source) for parse in parsers.values()]
+        columns = (f"{speed:>20,.0f} {size:>12,}" for speed, size in results)
+        print(f"{len(source):>8} " + " ".join(columns))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(args.pop(0) if args and args[0] in GRAMMARS else "arithmetic", list(map(int, args)))
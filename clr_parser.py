@@ -1,30 +1,157 @@
 from itertools import chain
-from typing import Any, Callable, Iterable
+from typing import Any, Callable, Iterable, NamedTuple
 from grammar import Rule  # do I really need the Rule type here?
+from compact_table import ACCEPT, ERROR, CompactTable
+from lazy_table import LazyTable
+
+IntegerTable = NamedTuple(
+    "IntegerTable",
+    rules=list[Rule | None], actions=list[dict[str, int]], gotos=list[dict[str, int]],
+)
+
+
+def integer_tables(
+    action_table: dict[tuple[int, str], tuple], goto_table: dict[tuple[int, str], int]
+) -> IntegerTable:
+    # rows of action codes as in CompactTable: shift j is j, reduce by rule r is -r-1
+    rules = [None] + list(dict.fromkeys(
+        action[1] for action in action_table.values() if action[0] == "reduce"
+    ))
+    rule_ids = {rule: i for i, rule in enumerate(rules)}
+    states = 1 + max(
+        [state for state, _ in action_table] + [state for state, _ in goto_table]
+        + list(goto_table.values()), default=0
+    )
+    actions, gotos = [{} for _ in range(states)], [{} for _ in range(states)]
+    for (state, symbol), action in action_table.items():
+        match action:
+            case ("shift", j):
+                actions[state][symbol] = j
+            case ("reduce", rule):
+                actions[state][symbol] = -rule_ids[rule] - 1
+            case ("accept",):
+                actions[state][symbol] = ACCEPT
+    for (state, head), j in goto_table.items():
+        gotos[state][head] = j
+    return IntegerTable(rules, actions, gotos)
+
+
+class Reductions(dict):
+    # callback, body length and head by rule id, made the first time the rule is reduced so
+    # that starting a parse does not depend on the size of the grammar, heads can be given as ids
+    __slots__ = ("rules", "postprocessings", "heads")
+
+    def __init__(
+        self, rules: list[Rule | None], postprocessings: dict[Rule, Callable], heads=None
+    ):
+        super().__init__()
+        self.rules, self.postprocessings, self.heads = rules, postprocessings, heads
+
+    def __missing__(self, rule_id: int) -> tuple[Callable, int, str | int]:
+        rule = self.rules[rule_id]
+        callback = self.postprocessings.get(rule, lambda *x, head=rule.head: (head, *x))
+        head = rule.head if self.heads is None else self.heads[rule_id]
+        reduction = self[rule_id] = callback, len(rule.body), head
+        return reduction
+
+
+class PushParser:
+    # keeps the LR stacks between feeds, values are reduced as soon as the lookahead allows
+    __slots__ = ("actions", "gotos", "reductions", "states", "values", "top")
+
+    def __init__(
+        self,
+        action_table: dict[tuple[int, str], tuple] | IntegerTable | LazyTable,
+        goto_table: dict[tuple[int, str], int] | None,
+        postprocessings: dict[Rule, Callable],
+    ):
+        # Without a goto table the rows are given, a LazyTable makes them as the parser needs
+        # them. Dict tables are converted here, callers that parse often convert them once.
+        if goto_table is None:
+            table = action_table
+        else:
+            table = integer_tables(action_table, goto_table)
+        self.actions, self.gotos = table.actions, table.gotos
+        self.reductions = Reductions(table.rules, postprocessings)
+        # values[i] belongs to the symbol that led to states[i], both stacks grow by doubling
+        self.states, self.values, self.top = [0] * 256, [None] * 256, 0
+
+    def feed(self, source: Iterable[tuple[str, Any]]):
+        # returns the value of the whole input once the endmarker (None, None) is accepted
+        actions, gotos, reductions = self.actions, self.gotos, self.reductions
+        states, values, top = self.states, self.values, self.top
+        try:
+            for token_type, token in source:
+                while True:
+                    action = actions[states[top]].get(token_type, ERROR)
+                    if action > 0:
+                        top += 1
+                        if top == len(states):
+                            states.extend(states), values.extend(values)
+                        states[top], values[top] = action, token
+                        break
+                    elif action < ACCEPT:
+                        callback, length, head = reductions[-action - 1]
+                        result = callback(*values[top - length + 1:top + 1])
+                        top -= length - 1
+                        if top == len(states):
+                            states.extend(states), values.extend(values)
+                        states[top], values[top] = gotos[states[top - 1]][head], result
+                    elif action == ACCEPT:
+                        return values[top]
+                    else:
+                        raise ValueError("Unexpected token: " + repr(token_type))
+        finally:
+            self.top = top
+
+    def close(self):
+        return self.feed([(None, None)])
 
 
 def parse(
-    action_table: dict[tuple[int, str], tuple],
-    goto_table: dict[tuple[int, str], tuple],
+    action_table: dict[tuple[int, str], tuple] | IntegerTable | LazyTable,
+    goto_table: dict[tuple[int, str], int] | None,
     postprocessings: dict[Rule, Callable],
     source: Iterable[tuple[str, Any]],
 ):
-    tokens = chain(iter(source), [(None, None)])
-    stack = [0]
-    token_type, next_token = next(tokens)
-    while True:
-        match action_table.get((stack[-1], token_type), "error"):
-            case "error":
+    parser = PushParser(action_table, goto_table, postprocessings)
+    parser.feed(source)
+    return parser.close()
+
+
+def parse_compact(
+    table: CompactTable,
+    postprocessings: dict[Rule, Callable],
+    source: Iterable[tuple[str, Any]],
+):
+    reductions = Reductions(table.rules, postprocessings, table.rule_heads)
+    base, check, value = table.action_base, table.action_check, table.action_value
+    goto_base, goto_check, goto_value = table.goto_base, table.goto_check, table.goto_value
+    default_actions, default_gotos = table.default_actions, table.default_gotos
+    symbol_ids, unknown_symbol = table.symbol_ids, len(table.symbols)
+    states, values, top = [0] * 256, [None] * 256, 0
+    for token_type, token in chain(source, [(None, None)]):
+        symbol = symbol_ids.get(token_type, unknown_symbol)
+        while True:
+            state = states[top]
+            k = base[state] + symbol
+            action = value[k] if check[k] == state else default_actions[state]
+            if action > 0:
+                top += 1
+                if top == len(states):
+                    states.extend(states), values.extend(values)
+                states[top], values[top] = action, token
+                break
+            elif action < ACCEPT:
+                callback, length, head = reductions[-action - 1]
+                result = callback(*values[top - length + 1:top + 1])
+                top -= length - 1
+                if top == len(states):
+                    states.extend(states), values.extend(values)
+                k = goto_base[head] + states[top - 1]
+                states[top] = goto_value[k] if goto_check[k] == head else default_gotos[head]
+                values[top] = result
+            elif action == ACCEPT:
+                return values[top]
+            else:
                 raise ValueError("Unexpected token: " + repr(token_type))
-            case ("shift", j):
-                stack.append(next_token)
-                stack.append(j)
-                token_type, next_token = next(tokens)
-            case ("reduce", rule):
-                f = postprocessings.get(rule, lambda *x: (rule.head, *x))
-                stack, body = stack[: -len(rule.body) * 2], stack[-len(rule.body)*2::2]
-                state = goto_table[stack[-1], rule.head]
-                stack.append(f(*body))
-                stack.append(state)
-            case ("accept",):
-                return stack[1]
@@ -0,0 +1,97 @@
+from collections import Counter
+from clr_parser import integer_tables
+from compact_table import ACCEPT
+
+MODULE_TEMPLATE = '''\
+# Generated by codegen.py from {states} LR states, do not edit.
+from itertools import chain
+
+RULES = (
+    None,
+{rules}
+)
+LENGTHS = {lengths}
+# action codes by token type and state: shift j is j, reduce by rule r is -r-1, 0 is error
+COLUMNS = {{
+{columns}
+}}
+# goto states by nonterminal, indexed by the state below the reduced body
+GOTO_COLUMNS = {{
+{goto_columns}
+}}
+RULE_GOTOS = (None,) + tuple(GOTO_COLUMNS[head] for head, _ in RULES[1:])
+
+
+def parser(postprocessings={{}}):
+    callbacks = [None] + [
+        postprocessings.get(rule, lambda *x, head=rule[0]: (head, *x)) for rule in RULES[1:]
+    ]
+
+    def parse(source):
+        tokens = chain(iter(source), [(None, None)])
+        states, values, top = [0] * 256, [None] * 256, 0
+        token_type, next_token = next(tokens)
+        column = COLUMNS.get(token_type)
+        while True:
+            action = column[states[top]] if column else 0
+            if action > 0:
+                top += 1
+                if top == len(states):
+                    states.extend(states), values.extend(values)
+                states[top], values[top] = action, next_token
+                token_type, next_token = next(tokens)
+                column = COLUMNS.get(token_type)
+            elif action < {accept}:
+                rule = -action - 1
+                length = LENGTHS[rule]
+{reductions}
+                top -= length - 1
+                if top == len(states):
+                    states.extend(states), values.extend(values)
+                states[top], values[top] = RULE_GOTOS[rule][states[top - 1]], result
+            elif action == {accept}:
+                return values[top]
+            else:
+                raise ValueError("Unexpected token: " + repr(token_type))
+    return parse
+'''
+
+
+def reduction_code(arities: list[int], indent: str) -> str:
+    # calls with unpacked arguments for the most common rule lengths, a slice for the rest
+    lines = []
+    for arity in arities:
+        arguments = ", ".join(
+            f"values[top - {offset}]" if offset else "values[top]"
+            for offset in range(arity - 1, -1, -1)
+        )
+        keyword = "elif" if lines else "if"
+        lines += [f"{keyword} length == {arity}:", f"    result = callbacks[rule]({arguments})"]
+    fallback = "result = callbacks[rule](*values[top - length + 1:top + 1])"
+    lines += ["else:", "    " + fallback] if lines else [fallback]
+    return "\n".join(indent + line for line in lines)
+
+
+def generate_parser_module(
+    action_table: dict[tuple[int, str], tuple], goto_table: dict[tuple[int, str], int]
+) -> str:
+    rules, actions, gotos = integer_tables(action_table, goto_table)
+    states = range(len(actions))
+    symbols = dict.fromkeys(symbol for row in actions for symbol in row)
+    lengths = [0] + [len(rule.body) for rule in rules[1:]]
+    arities = [arity for arity, _ in Counter(lengths[1:]).most_common(4)]
+    return MODULE_TEMPLATE.format(
+        states=len(actions),
+        rules="\n".join(f"    {(rule.head, tuple(rule.body))!r}," for rule in rules[1:]),
+        lengths=repr(tuple(lengths)),
+        columns="\n".join(
+            f"    {symbol!r}: {tuple(actions[state].get(symbol, 0) for state in states)!r},"
+            for symbol in symbols
+        ),
+        goto_columns="\n".join(
+            f"    {head!r}: {tuple(gotos[state].get(head, 0) for state in states)!r},"
+            for head in dict.fromkeys(rule.head for rule in rules[1:])
+        ),
+        accept=ACCEPT,
+        reductions=reduction_code(sorted(arities), " " * 16),
+    )
@@ -0,0 +1,118 @@
+import marshal
+from array import array
+from collections import Counter
+from grammar import Rule
+
+ERROR, ACCEPT = 0, -1  # shift j is encoded as j and reduce by rule r as -r-1, rule 0 is accept
+ARRAYS = (
+    "rule_heads", "rule_lengths", "default_actions", "action_base", "action_check",
+    "action_value", "default_gotos", "goto_base", "goto_check", "goto_value",
+)
+
+
+def pack_rows(
+    rows: dict[int, dict[int, int]], size: int, width: int
+) -> tuple[array, array, array]:
+    # row displacement ("comb") compression: rows are overlapped at the first offset
+    # where their entries do not collide, check[] tells which row owns the slot
+    base, check, value = array("i", [0] * size), array("i"), array("i")
+    offset_hint = 0
+    for row_id, row in sorted(rows.items(), key=lambda r: -len(r[1])):
+        columns = sorted(row)
+        offset = max(0, offset_hint - columns[0]) if columns else 0
+        while any(offset + c < len(check) and check[offset + c] != -1 for c in columns):
+            offset += 1
+        if len(check) < offset + width:
+            check.extend([-1] * (offset + width - len(check)))
+            value.extend([0] * (offset + width - len(value)))
+        base[row_id] = offset
+        for column in columns:
+            check[offset + column], value[offset + column] = row_id, row[column]
+        while offset_hint < len(check) and check[offset_hint] != -1:
+            offset_hint += 1
+    if len(check) < width:
+        check.extend([-1] * (width - len(check)))
+        value.extend([0] * (width - len(value)))
+    return base, check, value
+
+
+class CompactTable:
+    __slots__ = (
+        "symbols", "symbol_ids", "rules", "rule_heads", "rule_lengths",
+        "default_actions", "action_base", "action_check", "action_value",
+        "default_gotos", "goto_base", "goto_check", "goto_value",
+    )
+
+    def __init__(
+        self, action_table: dict[tuple[int, str], tuple], goto_table: dict[tuple[int, str], int]
+    ):
+        self.symbols: list[str | None] = list(dict.fromkeys(
+            [None] + [symbol for _, symbol in action_table] + [symbol for _, symbol in goto_table]
+        ))
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.rules: list[Rule | None] = [None] + list(dict.fromkeys(
+            action[1] for action in action_table.values() if action[0] == "reduce"
+        ))
+        rule_ids = {rule: i for i, rule in enumerate(self.rules)}
+        self.rule_heads = array("i", [0] + [self.symbol_ids[r.head] for r in self.rules[1:]])
+        self.rule_lengths = array("i", [0] + [len(r.body) for r in self.rules[1:]])
+        states = 1 + max(
+            [state for state, _ in action_table] + [state for state, _ in goto_table]
+            + list(goto_table.values()), default=0
+        )
+        rows = {state: {} for state in range(states)}
+        for (state, symbol), action in action_table.items():
+            match action:
+                case ("shift", j):
+                    code = j
+                case ("reduce", rule):
+                    code = -rule_ids[rule] - 1
+                case ("accept",):
+                    code = ACCEPT
+            rows[state][self.symbol_ids[symbol]] = code
+        # default reductions: the most common reduction of a state needs no entries
+        self.default_actions = array("i", [ERROR] * states)
+        for state, row in rows.items():
+            if reductions := Counter(code for code in row.values() if code < ACCEPT):
+                default = self.default_actions[state] = reductions.most_common(1)[0][0]
+                rows[state] = {symbol: code for symbol, code in row.items() if code != default}
+        # one extra column for tokens that are not in the grammar
+        self.action_base, self.action_check, self.action_value = pack_rows(
+            rows, states, len(self.symbols) + 1
+        )
+        columns = {self.symbol_ids[symbol]: {} for _, symbol in goto_table}
+        for (state, symbol), j in goto_table.items():
+            columns[self.symbol_ids[symbol]][state] = j
+        self.default_gotos = array("i", [0] * len(self.symbols))
+        for symbol, column in columns.items():
+            default = self.default_gotos[symbol] = Counter(column.values()).most_common(1)[0][0]
+            columns[symbol] = {state: j for state, j in column.items() if j != default}
+        self.goto_base, self.goto_check, self.goto_value = pack_rows(
+            columns, len(self.symbols), states
+        )
+
+    def action(self, state: int, symbol: int) -> int:
+        k = self.action_base[state] + symbol
+        if self.action_check[k] == state:
+            return self.action_value[k]
+        return self.default_actions[state]
+
+    def goto(self, state: int, head: int) -> int:
+        k = self.goto_base[head] + state
+        if self.goto_check[k] == head:
+            return self.goto_value[k]
+        return self.default_gotos[head]
+
+    def to_bytes(self) -> bytes:
+        rules = [None] + [(head, tuple(body)) for head, body in self.rules[1:]]
+        return marshal.dumps((self.symbols, rules, [getattr(self, a).tobytes() for a in ARRAYS]))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactTable":
+        table = cls.__new__(cls)
+        symbols, rules, arrays = marshal.loads(data)
+        table.symbols, table.symbol_ids = symbols, {s: i for i, s in enumerate(symbols)}
+        table.rules = [None] + [Rule(head, body) for head, body in rules[1:]]
+        for name, buffer in zip(ARRAYS, arrays, strict=True):
+            setattr(table, name, array("i", buffer))
+        return table
@@ -0,0 +1,10 @@
+import os
+import shutil
+import tempfile
+
+# tables built by the tests, also while importing modules like ebnf, go to a temporary cache
+cache_directory = os.environ["GRAMMAR_CACHE_DIR"] = tempfile.mkdtemp(prefix="grammar-cache-")
+
+
+def pytest_sessionfinish():
+    shutil.rmtree(cache_directory, ignore_errors=True)
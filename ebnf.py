@@ -1,11 +1,14 @@
 from collections import Counter
 from functools import cached_property
-from parser import ast_to_str, lr_parser
+from incremental_parser import IncrementalParser
+from parser import ast_to_str, lr_parser, lr_table
 from pathlib import Path
 from re import compile as re
 from typing import Any, Iterable
-from lexer import construct_lexer
+from grammar import Grammar
+from lexer import construct_array_lexer, construct_lexer
 from libs.set_utils import add_to_set
+from syntax import Syntax, literal_scanner
 
 # Extended Backus–Naur form
 #    =    definition
@@ -20,14 +23,15 @@ from libs.set_utils import add_to_set
 #    -    exception  <-- not supported yet
 #    ;    termination
 
-scan_ebnf_tokens = construct_lexer({
+ebnf_token_patterns = {
     re(r"\s+"): None,
     re(r"[-|,(){}\[\]=;]"): lambda _, s: (s, s),
     re(r"\w+(\s+\w+)*"): lambda _, s: ("identifier", s),
     re(r"\?[^?]+\?"): lambda _, s: ("special sequence", s),
     re(r'"[^"]+"'): lambda _, s: ("terminal", s),
     re(r"'[^']+'"): lambda _, s: ("terminal", s),
-})
+}
+scan_ebnf_tokens = construct_lexer(ebnf_token_patterns)
 parse_ebnf_tokens = lr_parser({
     ("defs", ("def", "defs")): lambda x, y: [x] + y,
     ("defs", ("def",)): lambda x: [x],
@@ -45,6 +49,71 @@ parse_ebnf_tokens = lr_parser({
 })
 
 
+def ebnf_repr(node, operator_lvl: int = 0) -> str:
+    match node:
+        case "alt", *alts:
+            result = " | ".join(ebnf_repr(alt, 1) for alt in alts)
+            return result if operator_lvl < 1 else f"({result})"
+        case "cat", *terms:
+            result = ", ".join(ebnf_repr(term, 2) for term in terms)
+            return result if operator_lvl < 2 else f"({result})"
+        case "opt", value:
+            return "[" + ebnf_repr(value) + "]"
+        case "rep", value:
+            return "{" + ebnf_repr(value) + "}"
+        case terminal:
+            return terminal
+
+
+def span_of(value) -> tuple[int, int] | None:
+    # the span of a node or a token, of the items of a repetition, None when nothing was parsed
+    if isinstance(value, list):
+        spans = [span for item in value if (span := span_of(item)) is not None]
+        return (spans[0][0], spans[-1][1]) if spans else None
+    return value and value[0]
+
+
+def repeated(pairs: tuple | None) -> list:
+    # a repetition reduces to pairs (previous pairs, item), its parent gets a list of the items
+    items = []
+    while pairs is not None:
+        pairs, item = pairs
+        items.append(item)
+    items.reverse()
+    return items
+
+
+def repetition_reduction(
+    body: tuple[str, ...], label: str | None, nullable: set[str], repetitions: set[str]
+):
+    # the empty repetition is None, every item adds a pair
+    if not body:
+        return lambda: None
+    if len(body) > 2:
+        item = node_reduction(label, body[1:], nullable, repetitions)
+        return lambda pairs, *x: (pairs, item(*x))
+    if body[1] in repetitions:
+        return lambda pairs, item: (pairs, repeated(item))
+    return lambda pairs, item: (pairs, item)
+
+
+def node_reduction(head: str, body: tuple[str, ...], nullable: set[str], repetitions: set[str]):
+    # the span of a node comes from its first and last children unless they can be empty
+    lists = [i for i, symbol in enumerate(body) if symbol in repetitions]
+    if body and body[0] not in nullable and body[-1] not in nullable:
+        if not lists:
+            return lambda *x: ((x[0][0][0], x[-1][0][1]), head, *x)
+        return lambda *x: (
+            (x[0][0][0], x[-1][0][1]), head,
+            *(repeated(c) if i in lists else c for i, c in enumerate(x)),
+        )
+
+    def reduction(*x):
+        children = [repeated(c) if i in lists else c for i, c in enumerate(x)]
+        return span_of(children), head, *children
+    return reduction
+
+
 def parse_ebnf_rules(source: str, i: int = 0) -> dict[str, tuple]:
     rules = parse_ebnf_tokens(scan_ebnf_tokens(source, i))
     for var in (var for var, cnt in Counter(var for var, _ in rules).items() if cnt > 1):
@@ -70,26 +139,12 @@ class EBNF:
             raise Exception(f"Undefined variable {var}")
 
     def __repr__(self):
-        def node_repr(node, operator_lvl=0):
-            match node:
-                case "alt", *alts:
-                    result = " | ".join(node_repr(alt, 1) for alt in alts)
-                    return result if operator_lvl < 1 else f"({result})"
-                case "cat", *terms:
-                    result = ", ".join(node_repr(term, 2) for term in terms)
-                    return result if operator_lvl < 2 else f"({result})"
-                case "opt", value:
-                    return "[" + node_repr(value) + "]"
-                case "rep", value:
-                    return "{" + node_repr(value) + "}"
-                case terminal:
-                    return terminal
         result = []
         for head, body in self.rules.items():
             if body[0] != "alt":
-                result.append(f"{head} = {node_repr(body)};")
+                result.append(f"{head} = {ebnf_repr(body)};")
                 continue
-            body = [node_repr(alt, 1) for alt in body[1:]]
+            body = [ebnf_repr(alt, 1) for alt in body[1:]]
             if sum(map(len, body)) + 3 * len(body) + 1 + len(head) <= 72:
                 result.append(f"{head} = {' | '.join(body)};")
                 continue
@@ -105,48 +160,100 @@ class EBNF:
         return "\n".join(result)
 
     @cached_property
-    def parsing_rules(self):
-        rules, used_names = {}, set(self.symbols)
-
-        def dfs(head, body):
-            nonlocal used_names
-            used_names.add(head)
-            if body in used_names:
-                body = ("cat", body)
-            args = tuple(
-                str(arg) if str(arg) in used_names else dfs(str(arg), arg) for arg in body[1:]
-            )
-            if body[0] == "alt":
-                _ = [dfs(head, expr) for expr in body[1:]]
-            elif body[0] == "cat":
-                if args:
-                    rules[head, args] = lambda *x, head=head: ((x[0][0][0], x[-1][0][1]), head, *x)
-                else:
-                    rules[head, args] = lambda head=head: (head, ((None, None),))
-            elif body[0] == "opt":
-                return dfs(head, ("alt", args[0], ("cat",)))
-            elif body[0] == "rep":
-                arg = args[0]
-                arg_repeated = add_to_set(used_names, str(arg) + " repeated")
-                dfs(arg_repeated, ("opt", ("cat", arg_repeated, arg)))
-                return dfs(head, (arg_repeated,))
-            return head
-
-        for head, expr in (
-            (head, expr)
-            for head, alts in self.rules.items()
-            for expr in (alts[1:] if alts[0] == "alt" else [alts])
-        ):
-            # TODO: use stack instead of complex local function
-            old_rules, rules = rules, {}
-            dfs(head, expr)
-            rules = old_rules | dict(reversed(rules.items()))
+    def parsing_rules(self) -> dict[tuple[str, tuple[str, ...]], Any]:
+        # Every alternative is a rule. Options, repetitions and groups become variables named
+        # after their EBNF text, shared by all places with the same expression. Nodes are
+        # (span, head, *children), repetitions are lists and options that are left out are None.
+        # The alternatives of a repetition are its own rules, an item of several symbols becomes
+        # a node labelled with its EBNF text when the repetition reduces.
+        bodies, names, used_names, repetitions, labels = [], {}, set(self.symbols), set(), {}
+
+        def symbol(expr) -> str:
+            match expr:
+                case str(name):
+                    return name
+                case "alt" | "cat", single:
+                    return symbol(single)
+            if (name := names.get(expr)) is None:
+                name = names[expr] = add_to_set(used_names, ebnf_repr(expr, 2))
+                queue.append((name, expr))
+                if expr[0] == "rep":
+                    repetitions.add(name)
+            return name
+
+        def alternatives(expr) -> list:
+            match expr:
+                case "alt", *alts:
+                    return [alt for expr in alts for alt in alternatives(expr)]
+                case "opt", value:
+                    return alternatives(value) + [("cat",)]
+            return [expr]
+
+        def symbols(alt) -> tuple[str, ...]:
+            return tuple(map(symbol, alt[1:])) if alt[0] == "cat" else (symbol(alt),)
+
+        queue = list(self.rules.items())
+        for head, expr in queue:  # the queue grows with the variables of sub-expressions
+            if head not in repetitions:
+                bodies += [(head, symbols(alt)) for alt in alternatives(expr)]
+                continue
+            bodies.append((head, ()))
+            for alt in filter(lambda alt: alt != ("cat",), alternatives(expr[1])):
+                bodies.append((head, (head, *symbols(alt))))
+                labels[bodies[-1]] = ebnf_repr(alt, 2)
+        nullable, groups, rules = Grammar(bodies).nullable, set(names.values()), {}
+        for head, body in bodies:
+            if head in repetitions:
+                label = labels.get((head, body))
+                rules[head, body] = repetition_reduction(body, label, nullable, repetitions)
+            elif not body and head in groups:
+                rules[head, body] = lambda: None
+            elif len(body) == 1 and head in groups:
+                rules[head, body] = repeated if body[0] in repetitions else lambda x: x
+            else:
+                rules[head, body] = node_reduction(head, body, nullable, repetitions)
         return rules
 
+    @cached_property
+    def token_types(self):
+        return {re(s[1:-1]) if s[0] == "?" else s[1:-1]: s for s in self.terminals}
+
+    @cached_property
+    def token_values(self):
+        return {tok: lambda span, s, tok=tok: (span, tok, s) for tok in self.terminals}
+
+    @cached_property
+    def token_patterns(self):
+        return {
+            pat: lambda span, s, tok=tok: (tok, (span, tok, s))
+            for pat, tok in self.token_types.items()
+        }
+
     @cached_property
     def parse(self):
-        tokens = [(re(s[1:-1]) if s[0] == "?" else s[1:-1], s) for s in self.terminals]
-        patterns = {pat: lambda span, s, tok=tok: (tok, (span, tok, s)) for pat, tok in tokens}
-        scan = construct_lexer(patterns)
+        scan = construct_array_lexer(self.token_types, self.token_values)
         parse = lr_parser(self.parsing_rules)
         return lambda source, start=0: parse(scan(source, start))
+
+    def syntax(self) -> Syntax:
+        # The same grammar for Syntax.parse. Quoted terminals become literal tokens unless their
+        # text is the name of a variable, special sequences are regular expressions.
+        variables = {head for head, _ in self.parsing_rules}
+        names, scanners = {}, {}
+        for terminal in self.terminals:
+            text = terminal[1:-1]
+            if terminal[0] == "?":
+                scanners[terminal] = re(text)
+            elif text in variables:
+                scanners[terminal] = literal_scanner(text)
+            else:
+                names[terminal] = text
+        rules = {
+            (head, tuple(names.get(t, t) for t in body)): None for head, body in self.parsing_rules
+        }
+        return Syntax(rules, scanners)
+
+    def incremental_parser(self) -> IncrementalParser:
+        return IncrementalParser(
+            lr_table(self.parsing_rules), self.parsing_rules, self.token_patterns
+        )
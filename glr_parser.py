@@ -0,0 +1,212 @@
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+from clr_parser import IntegerTable, Reductions, integer_tables
+from compact_table import ACCEPT, ERROR
+from grammar import Rule
+
+Leaf = NamedTuple("Leaf", value=Any)
+Family = NamedTuple("Family", rule=Rule, children=tuple)
+
+
+class ForestNode:
+    # node of a shared packed parse forest, every family is one way to derive the span
+    __slots__ = ("symbol", "span", "families")
+
+    def __init__(self, symbol: str, span: tuple[int, int]):
+        self.symbol, self.span, self.families = symbol, span, []
+
+    def __repr__(self):
+        return f"ForestNode({self.symbol!r}, {self.span}, #families={len(self.families)})"
+
+
+class StackNode:
+    # node of a graph-structured stack, edges lead to the previous nodes
+    __slots__ = ("state", "level", "edges")
+
+    def __init__(self, state: int, level: int):
+        self.state, self.level = state, level
+        self.edges: dict[StackNode, ForestNode | Leaf] = {}
+
+
+def paths(
+    node: StackNode, length: int, through: tuple[StackNode, StackNode] | None = None
+) -> Iterator[tuple[StackNode, tuple]]:
+    # with an edge given as (node, previous node), only the paths that go over it
+    if length == 0:
+        if through is None:
+            yield node, ()
+        return
+    if through is not None and node.level != through[0].level:
+        return  # the path is below the level of the edge, it cannot come back to it
+    for previous_node, child in node.edges.items():
+        rest = None if through == (node, previous_node) else through
+        for start, children in paths(previous_node, length - 1, rest):
+            yield start, children + (child,)
+
+
+def deterministic_table(
+    action_table: dict[tuple[int, str], tuple[tuple, ...]], goto_table: dict[tuple[int, str], int]
+) -> IntegerTable:
+    # integer rows of the cells with one action for the LR mode, cells with several actions are
+    # errors there, states that only have such cells get empty rows
+    single_actions = {
+        cell: options[0] for cell, options in action_table.items() if len(options) == 1
+    }
+    table = integer_tables(single_actions, goto_table)
+    states = 1 + max(
+        [state for state, _ in action_table] + [
+            action[1] for options in action_table.values() for action in options
+            if action[0] == "shift"
+        ], default=0
+    )
+    table.actions.extend({} for _ in range(states - len(table.actions)))
+    table.gotos.extend({} for _ in range(states - len(table.gotos)))
+    return table
+
+
+def parse_forest(
+    action_table: dict[tuple[int, str], tuple[tuple, ...]],
+    goto_table: dict[tuple[int, str], int],
+    source: Iterable[tuple[str, Any]],
+    postprocessings: dict[Rule, Callable] | None = None,
+    table: IntegerTable | None = None,
+) -> ForestNode | Leaf:
+    # With postprocessings, the parser works as plain LR while there is only one possible action
+    # and keeps already evaluated values in the forest as leaves. The rows for this mode are
+    # made from the tables unless the deterministic_table of them is given.
+    tokens = chain(iter(source), [(None, None)])
+    root = StackNode(0, 0)
+    if postprocessings is None:
+        frontier = {0: root}
+    else:
+        frontier = None
+        if table is None:
+            table = deterministic_table(action_table, goto_table)
+        actions, gotos = table.actions, table.gotos
+        reductions = Reductions(table.rules, postprocessings)
+    # the LR stacks, values[i] and levels[i] belong to states[i], they grow by doubling
+    base, states, values, levels, top = root, [0] * 256, [None] * 256, [0] * 256, 0
+    for level, (token_type, token) in enumerate(tokens):
+        if frontier is None:
+            # an error or a cell with several actions is left to the graph-structured stack
+            while (action := actions[states[top]].get(token_type, ERROR)) != ERROR:
+                if action > 0:
+                    top += 1
+                    if top == len(states):
+                        states.extend(states), values.extend(values), levels.extend(levels)
+                    states[top], values[top], levels[top] = action, token, level + 1
+                    break
+                elif action == ACCEPT:
+                    return Leaf(values[top]) if top else base.edges[root]
+                callback, length, head = reductions[-action - 1]
+                if length > top:
+                    frontier = {}
+                    break
+                value = callback(*values[top - length + 1:top + 1])
+                top -= length - 1
+                if top == len(states):
+                    states.extend(states), values.extend(values), levels.extend(levels)
+                states[top], values[top], levels[top] = gotos[states[top - 1]][head], value, level
+            else:
+                frontier = {}
+            if frontier is None:
+                continue
+        forest: dict[tuple[str, int], ForestNode] = {}
+        has_empty_edges = False
+        if not frontier:
+            # the LR stack above the base becomes a path of the graph-structured stack
+            node = base
+            for i in range(1, top + 1):
+                node, previous_node = StackNode(states[i], levels[i]), node
+                node.edges[previous_node] = Leaf(values[i])
+                has_empty_edges |= levels[i] == previous_node.level
+                if levels[i] == level:
+                    frontier[states[i]] = node
+            frontier[node.state] = node
+        # a node is reduced along all its paths when it is new and along the paths over an edge
+        # when the edge is added later
+        queue: list[tuple[StackNode, tuple[StackNode, StackNode] | None]] = [
+            (n, None) for n in frontier.values()
+        ]
+        while queue:
+            node, through = queue.pop()
+            for action in action_table.get((node.state, token_type), ()):
+                if action[0] != "reduce" or through is not None and not action[1].body:
+                    continue
+                rule = action[1]
+                for start, children in list(paths(node, len(rule.body), through)):
+                    state = goto_table[start.state, rule.head]
+                    if (forest_node := forest.get((rule.head, start.level))) is None:
+                        forest_node = ForestNode(rule.head, (start.level, level))
+                        forest[rule.head, start.level] = forest_node
+                    if (family := Family(rule, children)) not in forest_node.families:
+                        forest_node.families.append(family)
+                    has_empty_edges |= start.level == level
+                    if (target := frontier.get(state)) is None:
+                        target = frontier[state] = StackNode(state, level)
+                        target.edges[start] = forest_node
+                        queue.append((target, None))
+                    elif start not in target.edges:
+                        target.edges[start] = forest_node
+                        # paths over empty edges can reach the new edge from other nodes
+                        if has_empty_edges:
+                            queue.extend((n, (target, start)) for n in frontier.values())
+                        else:
+                            queue.append((target, (target, start)))
+        next_frontier, leaf = {}, Leaf(token)
+        for node in frontier.values():
+            for action in action_table.get((node.state, token_type), ()):
+                if action[0] == "shift":
+                    if (target := next_frontier.get(action[1])) is None:
+                        target = next_frontier[action[1]] = StackNode(action[1], level + 1)
+                    target.edges[node] = leaf
+                elif action[0] == "accept":
+                    return node.edges[root]
+        if not next_frontier:
+            raise ValueError("Unexpected token: " + repr(token_type))
+        frontier = next_frontier
+        if len(frontier) == 1 and postprocessings is not None:
+            base = next(iter(frontier.values()))
+            frontier, top, states[0], levels[0] = None, 0, base.state, base.level
+
+
+def evaluate(
+    forest: ForestNode | Leaf,
+    postprocessings: dict[Rule, Callable],
+    choose: Callable[[list[Family]], Family] = lambda families: families[0],
+):
+    if isinstance(forest, Leaf):
+        return forest.value
+    values, chosen, stack = {}, {}, [forest]
+    while stack:
+        node = stack[-1]
+        if node in values:
+            stack.pop()
+        elif node not in chosen:
+            # families leading back to unfinished nodes would be cyclic derivations
+            chosen[node] = family = choose([
+                family for family in node.families if not any(
+                    isinstance(c, ForestNode) and c in chosen and c not in values
+                    for c in family.children
+                )
+            ])
+            stack.extend(c for c in family.children if isinstance(c, ForestNode))
+        else:
+            stack.pop()
+            rule, children = chosen[node]
+            arguments = [c.value if isinstance(c, Leaf) else values[c] for c in children]
+            f = postprocessings.get(rule)
+            values[node] = f(*arguments) if f is not None else (rule.head, *arguments)
+    return values[forest]
+
+
+def parse(
+    action_table: dict[tuple[int, str], tuple[tuple, ...]],
+    goto_table: dict[tuple[int, str], int],
+    postprocessings: dict[Rule, Callable],
+    source: Iterable[tuple[str, Any]],
+    choose: Callable[[list[Family]], Family] = lambda families: families[0],
+    table: IntegerTable | None = None,
+):
+    forest = parse_forest(action_table, goto_table, source, postprocessings, table)
+    return evaluate(forest, postprocessings, choose)
@@ -1,16 +1,80 @@
 from lib.deterministic import DeterministicSet as set
+from libs.advanced_collections_v151 import MutableIndexedSet
+from collections import deque
 from functools import cached_property, reduce
-from typing import Iterable, NamedTuple
-from contextlib import suppress
+from typing import Callable, Iterable, Iterator, NamedTuple, TypeVar
 
+T = TypeVar("T")
+V = TypeVar("V")
 Rule = NamedTuple("Rule", head=str, body=tuple[str])
 
 
-def push_if_not_in(xs: list, x):
-    with suppress(ValueError):
-        return xs.index(x)
-    xs.append(x)
-    return len(xs) - 1
+def closure(core_items: Iterable[T], expand: Callable[[T], Iterable[T]]) -> set[T]:
+    item_set = set(core_items)
+    queue = list(item_set)
+    while queue:
+        for new_item in expand(queue.pop()):
+            if new_item not in item_set:
+                item_set.add(new_item)
+                queue.append(new_item)
+    return item_set
+
+
+def lr_automaton(
+    root_item: T,
+    closure: Callable[[Iterable[T]], Iterable[T]],
+    goto_kernels: Callable[[Iterable[T]], list[tuple[str, tuple[T, ...]]]],
+) -> tuple[MutableIndexedSet[tuple[T, ...]], dict[tuple[int, str], int]]:
+    item_sets, gotos = MutableIndexedSet([(root_item,)]), {}
+    for i, item_set in enumerate(map(closure, item_sets)):
+        for symbol, kernel in goto_kernels(item_set):
+            gotos[i, symbol] = item_sets.push(kernel)
+    return item_sets, gotos
+
+
+def digraph(
+    nodes: Iterable[T], relation: Callable[[T], Iterable[T]], values: dict[T, V]
+) -> dict[T, V]:
+    # DeRemer & Pennello: value of x becomes union of values of everything reachable from x
+    values, depths, stack = dict(values), {}, []
+    for root in nodes:
+        if root in depths:
+            continue
+        stack.append(root)
+        depths[root] = len(stack)
+        path = [(root, len(stack), iter(relation(root)))]
+        while path:
+            x, depth, successors = path[-1]
+            for y in successors:
+                if y not in depths:
+                    stack.append(y)
+                    depths[y] = len(stack)
+                    path.append((y, len(stack), iter(relation(y))))
+                    break
+                depths[x] = min(depths[x], depths[y])
+                values[x] |= values[y]
+            else:
+                path.pop()
+                if depths[x] == depth:
+                    while (top := stack.pop()) != x:
+                        depths[top], values[top] = float("inf"), values[x]
+                    depths[x] = float("inf")
+                if path:
+                    parent = path[-1][0]
+                    depths[parent] = min(depths[parent], depths[x])
+                    values[parent] |= values[x]
+    return values
+
+
+def weakly_compatible(
+    lookaheads: dict[int, frozenset[int]], other: dict[int, frozenset[int]]
+) -> bool:
+    items = list(lookaheads)
+    return all(
+        not (lookaheads[x] & other[y] or other[x] & lookaheads[y])
+        or lookaheads[x] & lookaheads[y] or other[x] & other[y]
+        for i, x in enumerate(items) for y in items[i + 1:]
+    )
 
 
 class Grammar:
@@ -39,263 +103,320 @@ class Grammar:
         )
         self.symbols = self.variables | self.terminals
 
+    @cached_property
+    def symbol_ids(self) -> dict[str | None, int]:
+        # bit i of a symbol bitset stands for symbol_list[i], bit 0 is None (empty or endmarker)
+        return {symbol: i for i, symbol in enumerate(self.symbol_list)}
+
+    @cached_property
+    def symbol_list(self) -> list[str | None]:
+        return [None, *self.symbols]
+
+    def symbol_set(self, bits: int) -> set[str | None]:
+        digits, symbols = bin(bits)[:1:-1], set()
+        i = digits.find("1")
+        while i != -1:
+            symbols.add(self.symbol_list[i])
+            i = digits.find("1", i + 1)
+        return symbols
+
+    @cached_property
+    def nullable(self) -> set[str]:
+        nullable, queue, missing, uses = set(), [], {}, {}
+        for rule in self.rules:
+            missing[rule] = len(rule.body)
+            for symbol in dict.fromkeys(rule.body):
+                uses.setdefault(symbol, []).append(rule)
+            if not rule.body:
+                queue.append(rule)
+        while queue:
+            if (head := queue.pop().head) not in nullable:
+                nullable.add(head)
+                for rule in uses.get(head, ()):
+                    missing[rule] -= rule.body.count(head)
+                    if missing[rule] == 0:
+                        queue.append(rule)
+        return nullable
+
+    @cached_property
+    def prefix_bits(self) -> dict[str, int]:
+        ids, nullable, starts = self.symbol_ids, self.nullable, {}
+        values = {s: 1 << ids[s] if s in self.terminals else 0 for s in self.symbols}
+        for head, body in self.rules:
+            for symbol in body:
+                starts.setdefault(head, []).append(symbol)
+                if symbol not in nullable:
+                    break
+        values = digraph(self.symbols, lambda s: starts.get(s, ()), values)
+        return {s: bits | 1 if s in nullable else bits for s, bits in values.items()}
+
+    @cached_property
+    def follower_bits(self) -> dict[str, int]:
+        prefix_bits, values, ends = self.prefix_bits, {s: 0 for s in self.symbols}, {}
+        values[self.start] = 1  # None is input right endmarker.
+        for head, body in self.rules:
+            suffix_bits = 1
+            for symbol in reversed(body):
+                values[symbol] |= suffix_bits & ~1
+                if suffix_bits & 1:
+                    ends.setdefault(symbol, []).append(head)
+                first = prefix_bits[symbol]
+                suffix_bits = first & ~1 | suffix_bits if first & 1 else first
+        return digraph(self.symbols, lambda s: ends.get(s, ()), values)
+
+    @cached_property
+    def suffix_prefixes(self) -> dict[Rule, list[tuple[tuple[str, ...], bool]]]:
+        return {}  # memo of first_of_suffix
+
+    def first_of_suffix(self, rule: Rule, dot: int) -> tuple[tuple[str, ...], bool]:
+        # FIRST set of rule.body[dot:] without None and whether the suffix is nullable
+        if (suffixes := self.suffix_prefixes.get(rule)) is None:
+            suffixes, bits = [((), True)], 1
+            for symbol in reversed(rule.body):
+                first = self.prefix_bits[symbol]
+                bits = first & ~1 | bits if first & 1 else first
+                suffixes.append((tuple(self.symbol_set(bits & ~1)), bool(bits & 1)))
+            suffixes = self.suffix_prefixes[rule] = suffixes[::-1]
+        return suffixes[dot]
+
     @cached_property
     def prefixes(self) -> dict[str, set[str | None]]:
-        prefixes = {s: set([s] if s in self.terminals else []) for s in self.symbols}
-
-        def get_prefixes(body: tuple[str, ...]):
-            if len(body) == 0:
-                return set([None])
-            if None not in prefixes[body[0]]:
-                return prefixes[body[0]]
-            return prefixes[body[0]] - {None} | get_prefixes(body[1:])
-
-        done = False
-        while not done:
-            done = True
-            for head, body in self.rules:
-                firsts = get_prefixes(body)
-                for first in filter(lambda f: f not in prefixes[head], firsts):
-                    prefixes[head].add(first)
-                    done = False
-        return prefixes
+        return {s: self.symbol_set(bits) for s, bits in self.prefix_bits.items()}
 
     @cached_property
     def followers(self) -> dict[str, set[str | None]]:
-        followers = {v: set([]) for v in self.symbols}
-        followers[self.start].add(None)  # None is input right endmarker.
-        done = False
-        while not done:
-            done = True
-            for head, body in self.rules:
-                current_followers = followers[head]
-                for symbol in reversed(body):
-                    for follower in current_followers:
-                        if follower not in followers[symbol]:
-                            done = False
-                            followers[symbol].add(follower)
-                    current_followers = (
-                        self.prefixes[symbol] - {None} | current_followers
-                        if None in self.prefixes[symbol]
-                        else self.prefixes[symbol]
-                    )
-        return followers
+        return {s: self.symbol_set(bits) for s, bits in self.follower_bits.items()}
+
+    @cached_property
+    def rules_by_head(self) -> dict[str, list[Rule]]:
+        rules = {}
+        for rule in self.rules:
+            rules.setdefault(rule.head, []).append(rule)
+        return rules
+
+    # An LR item is an int: the id of its rule in item_rules, the dot and the symbol id of the
+    # follower, from the high bits to the low ones. LR(0) items have the follower None (id 0).
+    # Item sets and kernels are sets and sorted tuples of ints, cheap to hash and compare.
+    @cached_property
+    def item_rules(self) -> list[Rule]:
+        return [Rule(None, (self.start,)), *self.rules]  # rule 0 is the root rule
+
+    @cached_property
+    def symbol_bits(self) -> int:
+        return len(self.symbol_list).bit_length()
+
+    @cached_property
+    def dot_bits(self) -> int:
+        return max(len(rule.body) for rule in self.item_rules).bit_length()
+
+    def item(self, rule_id: int, dot: int = 0, follower: str | None = None) -> int:
+        return (rule_id << self.dot_bits | dot) << self.symbol_bits | self.symbol_ids[follower]
+
+    def item_parts(self, item: int) -> tuple[Rule, int, str | None]:
+        position = item >> self.symbol_bits
+        rule, dot = self.item_rules[position >> self.dot_bits], position & (1 << self.dot_bits) - 1
+        return rule, dot, self.symbol_list[item & (1 << self.symbol_bits) - 1]
+
+    @cached_property
+    def next_symbols(self) -> list[int]:
+        # id of the symbol after the dot by item >> symbol_bits, 0 when the dot is at the end
+        next_symbols = [0] * (len(self.item_rules) << self.dot_bits)
+        for i, rule in enumerate(self.item_rules):
+            for dot, symbol in enumerate(rule.body):
+                next_symbols[i << self.dot_bits | dot] = self.symbol_ids[symbol]
+        return next_symbols
+
+    @cached_property
+    def rule_items(self) -> dict[int, list[int]]:
+        # the items with the dot in front of the rules of a variable, by its symbol id
+        items = {}
+        for i, rule in enumerate(self.item_rules[1:], 1):
+            items.setdefault(self.symbol_ids[rule.head], []).append(self.item(i))
+        return items
+
+    @cached_property
+    def item_lookaheads(self) -> dict[int, tuple[tuple[int, ...], bool]]:
+        # first_of_suffix behind the variable after the dot as ids, by item >> symbol_bits
+        lookaheads = {}
+        for i, rule in enumerate(self.item_rules):
+            for dot, symbol in enumerate(rule.body):
+                if symbol in self.variables:
+                    firsts, nullable = self.first_of_suffix(rule, dot + 1)
+                    ids = tuple(map(self.symbol_ids.__getitem__, firsts))
+                    lookaheads[i << self.dot_bits | dot] = ids, nullable
+        return lookaheads
+
+    def lr0_closure(self, core_items: Iterable[int]) -> set[int]:
+        next_symbols, rule_items, shift = self.next_symbols, self.rule_items, self.symbol_bits
+        return closure(core_items, lambda item: rule_items.get(next_symbols[item >> shift], ()))
+
+    def lr1_closure(self, core_items: Iterable[int]) -> set[int]:
+        next_symbols, rule_items, shift = self.next_symbols, self.rule_items, self.symbol_bits
+        lookaheads, mask = self.item_lookaheads, (1 << shift) - 1
+
+        def expand(item: int):
+            position = item >> shift
+            if (items := rule_items.get(next_symbols[position])) is None:
+                return ()
+            firsts, nullable = lookaheads[position]
+            followers = firsts + (item & mask,) if nullable else firsts
+            return (rule_item | follower for rule_item in items for follower in followers)
+        return closure(core_items, expand)
+
+    def goto_kernels(self, item_set: Iterable[int]) -> list[tuple[str, tuple[int, ...]]]:
+        next_symbols, shift, kernels = self.next_symbols, self.symbol_bits, {}
+        for item in item_set:
+            if symbol := next_symbols[item >> shift]:
+                kernels.setdefault(symbol, []).append(item + (1 << shift))
+        return [(self.symbol_list[s], tuple(sorted(kernels[s]))) for s in sorted(kernels)]
+
+    def reductions(self, item_set: Iterable[int]) -> Iterator[tuple[Rule, str | None]]:
+        # rules and followers of the items with the dot at the end
+        next_symbols, rules, symbols = self.next_symbols, self.item_rules, self.symbol_list
+        shift, dot_bits, mask = self.symbol_bits, self.dot_bits, (1 << self.symbol_bits) - 1
+        for item in item_set:
+            if not next_symbols[position := item >> shift]:
+                yield rules[position >> dot_bits], symbols[item & mask]
 
     def construct_ll1_parsing_table(self):
         table = {}
-        for head, body in self.rules:
-            body_prefixes = reduce(
-                lambda u, v: u | v - {None} if None in v else v,
-                [self.prefixes[s] for s in reversed(body)],
-                set([None]),
-            )
-            for term in body_prefixes & self.terminals:
+        for rule in self.rules:
+            head, body = rule
+            firsts, nullable = self.first_of_suffix(rule, 0)
+            for term in firsts:
                 assert (head, term) not in table, "Conflict!"
                 table[head, term] = (head, body)
-            if all(None in self.prefixes[symbol] for symbol in body):
+            if nullable:
                 for term in self.followers[head]:
                     assert (head, term) not in table, "Conflict!"
                     table[head, term] = (head, body)
         return table
 
     def construct_slr_parsing_table(self):
-        # TODO: simplify this method by splitting into functions
-        item_sets = [{(None, 0, self.start)}]
-        gotos = {}
-        for i, item_set in enumerate(map(set, item_sets)):
-            done = False
-            while not done:
-                done = True
-                for head, j, *body in list(item_set):
-                    if j >= len(body) or body[j] not in self.variables:
-                        continue
-                    next_symbol = body[j]
-                    for head, body in self.rules:  # TODO: optimize by per-head rules
-                        if head == next_symbol:
-                            item = (head, 0) + tuple(body)
-                            if item not in item_set:
-                                item_set.add(item)
-                                done = False
-            # TODO: use more efficient way to find next sets
-            for next_symbol in self.symbols:
-                next_set = {
-                    (head, i + 1) + tuple(body)
-                    for head, i, *body in item_set
-                    if i < len(body) and body[i] == next_symbol
-                }
-                if next_set:
-                    if next_set not in item_sets:
-                        j = len(item_sets)
-                        item_sets.append(next_set)
-                    else:
-                        j = item_sets.index(next_set)
-                    gotos[i, next_symbol] = j
-        actions = {}
-        for i, item_set in enumerate(map(set, item_sets)):
-            done = False
-            while not done:
-                done = True
-                for head, j, *body in list(item_set):
-                    if j >= len(body) or body[j] not in self.variables:
-                        continue
-                    next_symbol = body[j]
-                    for head, body in self.rules:  # TODO: optimize by per-head rules
-                        if head == next_symbol:
-                            item = (head, 0) + tuple(body)
-                            if item not in item_set:
-                                item_set.add(item)
-                                done = False
-            for terminal in self.terminals:
-                if j := gotos.get((i, terminal), 0):
-                    assert (i, terminal) not in actions, "Conflict!"
-                    actions[i, terminal] = ("shift", j)
-            for head, j, *body in item_set:
-                if j != len(body):
-                    continue
-                elif head is None:
+        item_sets, gotos = lr_automaton(0, self.lr0_closure, self.goto_kernels)
+        actions = {k: ("shift", j) for k, j in gotos.items() if k[1] in self.terminals}
+        for i, item_set in enumerate(map(self.lr0_closure, item_sets)):
+            for rule, _ in self.reductions(item_set):
+                if rule.head is None:
                     assert (i, None) not in actions, "Conflict!"
                     actions[i, None] = ("accept",)
-                else:
-                    for follower in self.followers[head]:
-                        assert (i, follower) not in actions, "Conflict!"
-                        # TODO: use rule numbers instead of the rules themself
-                        actions[i, follower] = ("reduce", Rule(head, tuple(body)))
-        gotos = {(i, ch): j for (i, ch), j in gotos.items() if ch in self.variables}
-        return actions, gotos
+                    continue
+                for follower in self.followers[rule.head]:
+                    assert (i, follower) not in actions, "Conflict!"
+                    # TODO: use rule numbers instead of the rules themself
+                    actions[i, follower] = ("reduce", rule)
+        return actions, {k: v for k, v in gotos.items() if k[1] in self.variables}
 
     def construct_clr_parsing_table(self):
-        Item = NamedTuple("Item", dot=int, rule=Rule, follower=str)
-
-        def closure(core_items: set[Item]) -> set[Item]:
-            # TODO: Is it ok to define functions inside functions?
-            # https://stackoverflow.com/a/38937898
-            item_set = set(core_items)  # TODO: use some cool datastructure for queues
-            done = False
-            while not done:
-                done = True  # TODO: optimize by using queue instead of flags
-                for i, item_rule, follower in list(item_set):
-                    if i == len(item_rule.body) or item_rule.body[i] not in self.variables:
+        item_sets, gotos = lr_automaton(0, self.lr1_closure, self.goto_kernels)
+        return self.lr1_parsing_table(item_sets, gotos)
+
+    def construct_pager_parsing_table(self):
+        # Pager's "practical general method": LR(1) states with the same core are merged
+        # when it cannot introduce new conflicts (weak compatibility)
+        # states map LR(0) items (items with the follower id 0) to the ids of their followers
+        states, gotos, mask = [{0: frozenset([0])}], {}, (1 << self.symbol_bits) - 1
+        states_by_core, queue = {frozenset([0]): [0]}, deque([0])
+        while queue:
+            i = queue.popleft()
+            item_set = self.lr1_closure(
+                item | follower for item, followers in states[i].items() for follower in followers
+            )
+            for symbol, kernel in self.goto_kernels(item_set):
+                lookaheads = {}
+                for item in kernel:
+                    lookaheads.setdefault(item & ~mask, []).append(item & mask)
+                lookaheads = {item: frozenset(followers) for item, followers in lookaheads.items()}
+                core = frozenset(lookaheads)
+                for j in states_by_core.get(core, ()):
+                    if not weakly_compatible(states[j], lookaheads):
                         continue
-                    next_symbol = item_rule.body[i]
-                    # TODO: optimize by per-head rules
-                    for rule in filter(lambda r: r.head == next_symbol, self.rules):
-                        followers = reduce(
-                            lambda x, y: y - {None} | x if None in y else y,
-                            map(self.prefixes.get, reversed(item_rule.body[i+1:])), {follower}
-                        )
-                        for new_item in (Item(0, rule, symbol) for symbol in followers):
-                            if new_item not in item_set:
-                                item_set.add(new_item)
-                                done = False
-            return item_set
-        gotos, actions = {}, {}
-        # TODO: use something more appropriate for queue
-        item_sets = [{Item(0, Rule(None, (self.start,)), None)}]
-        for i, item_set in enumerate(map(closure, item_sets)):
-            # TODO: use more efficient way to find next sets
-            for next_symbol in self.symbols:
-                if next_set := {
-                    Item(i + 1, rule, follower) for i, rule, follower in item_set
-                    if i < len(rule.body) and rule.body[i] == next_symbol
-                }:
-                    gotos[i, next_symbol] = push_if_not_in(item_sets, next_set)
-        for i, item_set in enumerate(map(closure, item_sets)):
-            for terminal, j in ((t, j) for t in self.terminals if (j := gotos.get((i, t)))):
-                assert (i, terminal) not in actions, "Conflict!"
-                actions[i, terminal] = ("shift", j)
-            for item in filter(lambda item: item.dot == len(item.rule.body), item_set):
-                if item.rule.head is not None:
-                    assert (i, item.follower) not in actions, "Conflict!"
-                    actions[i, item.follower] = ("reduce", item.rule)
-                elif item.follower is None:
+                    if any(not lookaheads[item] <= states[j][item] for item in core):
+                        states[j] = {item: states[j][item] | lookaheads[item] for item in core}
+                        queue.append(j)
+                    break
+                else:
+                    j = len(states)
+                    states.append(lookaheads)
+                    states_by_core.setdefault(core, []).append(j)
+                    queue.append(j)
+                gotos[i, symbol] = j
+        reachable, stack = {0}, [0]
+        while stack:
+            i = stack.pop()
+            for j in (gotos[i, symbol] for symbol in self.symbols if (i, symbol) in gotos):
+                if j not in reachable:
+                    reachable.add(j)
+                    stack.append(j)
+        indexes = {i: k for k, i in enumerate(sorted(reachable))}
+        item_sets = [
+            {item | f for item, followers in states[i].items() for f in followers}
+            for i in sorted(reachable)
+        ]
+        gotos = {(indexes[i], s): indexes[j] for (i, s), j in gotos.items() if i in indexes}
+        return self.lr1_parsing_table(item_sets, gotos)
+
+    def lr1_parsing_table(self, item_sets: Iterable[Iterable[int]], gotos: dict):
+        actions = {k: ("shift", j) for k, j in gotos.items() if k[1] in self.terminals}
+        for i, item_set in enumerate(map(self.lr1_closure, item_sets)):
+            for rule, follower in self.reductions(item_set):
+                if rule.head is not None:
+                    assert (i, follower) not in actions, "Conflict!"
+                    actions[i, follower] = ("reduce", rule)
+                elif follower is None:
                     assert (i, None) not in actions, "Conflict!"
                     actions[i, None] = ("accept",)
         return actions, {k: v for k, v in gotos.items() if k[1] in self.variables}
 
     def construct_lalr_parsing_table(self):
-        # total_hours_wasted_here = 6
-        LR0Item = NamedTuple("LR0Item", dot=int, rule=Rule)
-        LR1Item = NamedTuple("LR1Item", dot=int, rule=Rule, follower=str)
-
-        def lr0_closure(core_items: set[LR0Item]) -> set[LR0Item]:
-            item_set = set(core_items)  # TODO: use some cool datastructure for queues
-            done = False
-            while not done:
-                done = True  # TODO: optimize by using queue instead of flags
-                for i, item_rule in list(item_set):
-                    if i == len(item_rule.body) or item_rule.body[i] not in self.variables:
-                        continue
-                    next_symbol = item_rule.body[i]
-                    # TODO: optimize by per-head rules
-                    for rule in filter(lambda r: r.head == next_symbol, self.rules):
-                        new_item = LR0Item(0, rule)
-                        if new_item not in item_set:
-                            item_set.add(new_item)
-                            done = False
-            return item_set
-
-        def lr1_closure(core_items: set[LR1Item]) -> set[LR1Item]:
-            item_set = set(core_items)  # TODO: use some cool datastructure for queues
-            done = False
-            while not done:
-                done = True  # TODO: optimize by using queue instead of flags
-                for i, item_rule, follower in list(item_set):
-                    if i == len(item_rule.body) or item_rule.body[i] not in self.variables:
-                        continue
-                    next_symbol = item_rule.body[i]
-                    # TODO: optimize by per-head rules
-                    for rule in filter(lambda r: r.head == next_symbol, self.rules):
-                        followers = reduce(
-                            lambda x, y: y - {None} | x if None in y else y,
-                            map(self.prefixes.get, reversed(item_rule.body[i+1:])), {follower}
-                        )
-                        for new_item in (LR1Item(0, rule, symbol) for symbol in followers):
-                            if new_item not in item_set:
-                                item_set.add(new_item)
-                                done = False
-            return item_set
-
-        gotos, actions = {}, {}
-        # TODO: use something more appropriate for queue
-        lr0_item_sets = [{LR0Item(0, Rule(None, (self.start,)))}]
-        for i, item_set in enumerate(map(lr0_closure, lr0_item_sets)):
-            # TODO: use more efficient way to find next sets
-            for next_symbol in self.symbols:
-                if next_set := {
-                    LR0Item(i + 1, rule) for i, rule in item_set
-                    if i < len(rule.body) and rule.body[i] == next_symbol
-                }:
-                    gotos[i, next_symbol] = push_if_not_in(lr0_item_sets, next_set)
-        lalr_item_sets = [set() for _ in lr0_item_sets]
-        lalr_item_sets[0].add(LR1Item(0, Rule(None, (self.start,)), None))
-        done = False
-        while not done:
-            done = True
-            for (i, next_symbol), j in gotos.items():
-                if not lalr_item_sets[i]:
+        actions, gotos = self.construct_glr_parsing_table()
+        for options in actions.values():
+            assert len(options) == 1, "Conflict!"
+        return {k: options[0] for k, options in actions.items()}, gotos
+
+    def construct_glr_parsing_table(self):
+        item_sets, gotos = lr_automaton(0, self.lr0_closure, self.goto_kernels)
+        actions = {k: [("shift", j)] for k, j in gotos.items() if k[1] in self.terminals}
+        lookaheads = self.lalr_lookaheads(gotos)
+        for i, item_set in enumerate(map(self.lr0_closure, item_sets)):
+            for rule, _ in self.reductions(item_set):
+                if rule.head is None:
+                    actions.setdefault((i, None), []).append(("accept",))
                     continue
-                item_set = lr1_closure(lalr_item_sets[i])
-                next_set = {
-                    LR1Item(i + 1, rule, follower) for i, rule, follower in item_set
-                    if i < len(rule.body) and rule.body[i] == next_symbol
-                }
-                for item in next_set:
-                    if item in lalr_item_sets[j]:
-                        continue
-                    lalr_item_sets[j].add(item)
-                    done = False
-        for i, item_set in enumerate(map(lr1_closure, lalr_item_sets)):
-            for terminal, j in ((t, j) for t in self.terminals if (j := gotos.get((i, t)))):
-                assert (i, terminal) not in actions, "Conflict!"
-                actions[i, terminal] = ("shift", j)
-            for item in filter(lambda item: item.dot == len(item.rule.body), item_set):
-                if item.rule.head is not None:
-                    assert (i, item.follower) not in actions, "Conflict!"
-                    actions[i, item.follower] = ("reduce", item.rule)
-                elif item.follower is None:
-                    assert (i, None) not in actions, "Conflict!"
-                    actions[i, None] = ("accept",)
+                for follower in lookaheads[i, rule]:
+                    actions.setdefault((i, follower), []).append(("reduce", rule))
+        actions = {k: tuple(options) for k, options in actions.items()}
         return actions, {k: v for k, v in gotos.items() if k[1] in self.variables}
 
-    # TODO: IELR: Just like CLR, but with tables almost as small as LALR
-    # TODO: GLR: Can parse every CFG in O(n^3), deterministic ones in O(n)
+    def lalr_lookaheads(self, gotos: dict[tuple[int, str], int]) -> dict[tuple[int, Rule], set]:
+        # DeRemer & Pennello "Efficient Computation of LALR(1) Look-Ahead Sets"
+        nullable = self.nullable
+        transitions, successors = [], {}
+        for i, symbol in gotos:
+            successors.setdefault(i, []).append(symbol)
+            if symbol in self.variables:
+                transitions.append((i, symbol))
+        direct_reads, reads = {}, {}
+        for i, head in transitions:
+            j = gotos[i, head]
+            followers = [s for s in successors.get(j, ()) if s in self.terminals]
+            direct_reads[i, head] = set(followers + [None] * (i == 0 and head == self.start))
+            reads[i, head] = [(j, s) for s in successors.get(j, ()) if s in nullable]
+        includes, lookback = {transition: [] for transition in transitions}, {}
+        for i, head in transitions:
+            for rule in self.rules_by_head.get(head, ()):
+                nullable_suffix = len(rule.body)
+                while nullable_suffix and rule.body[nullable_suffix - 1] in nullable:
+                    nullable_suffix -= 1
+                state = i
+                for k, symbol in enumerate(rule.body):
+                    if k + 1 >= nullable_suffix and symbol in self.variables:
+                        includes[state, symbol].append((i, head))
+                    state = gotos[state, symbol]
+                lookback.setdefault((state, rule), []).append((i, head))
+        read_sets = digraph(transitions, reads.__getitem__, direct_reads)
+        follow_sets = digraph(transitions, includes.__getitem__, read_sets)
+        return {
+            key: reduce(lambda x, y: x | y, map(follow_sets.get, sources), set())
+            for key, sources in lookback.items()
+        }
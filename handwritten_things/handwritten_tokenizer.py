@@ -1,5 +1,6 @@
 import enum
 from string import digits, ascii_letters, ascii_lowercase
+from libs.string_utils import LiteralTrie
 
 identifier_chars = set(digits + ascii_letters + "_$")
 
@@ -10,6 +11,7 @@ class Tokens(enum.Enum):
     keyword = enum.auto()
     identifier = enum.auto()
     newline = enum.auto()
+    error = enum.auto()
 
 
 def parse_number(source, keywords={}, offset=0):
@@ -32,11 +34,14 @@ def parse_word(source, keywords={}, offset=0):
     return None, offset
 
 
+def keyword_trie(keywords):
+    return keywords if isinstance(keywords, LiteralTrie) else LiteralTrie(keywords)
+
+
 def parse_keyword(source, keywords={}, offset=0):
-    for n, keyword in reversed(sorted((len(kw), kw) for kw in keywords)):
-        if offset + n > len(source) or source[offset : offset + n] != keyword:
-            continue
-        return (Tokens.keyword, keyword), offset + n
+    keyword = keyword_trie(keywords).longest(source, offset)
+    if keyword:
+        return (Tokens.keyword, keyword), offset + len(keyword)
     return None, offset
 
 
@@ -58,18 +63,27 @@ def parse_token(source, keywords={}, offset=0):
     return result, best_offset
 
 
-def parse(source, keywords={}, offset=0):
-    tokens = []
+def parse(source, keywords={}, offset=0, recover=False):
+    # with recover, text up to the next token or space becomes an error token instead of None
+    tokens, keywords = [], keyword_trie(keywords)
     while offset < len(source):
         if source[offset] in " \n":
             if source[offset] == "\n":
                 tokens.append((Tokens.newline, "\n"))
             offset += 1
         else:
-            token, offset = parse_token(source, keywords, offset)
+            token, new_offset = parse_token(source, keywords, offset)
             if not token:
-                return None
+                if not recover:
+                    return None
+                new_offset = offset + 1
+                while new_offset < len(source) and source[new_offset] not in " \n":
+                    if parse_token(source, keywords, new_offset)[0]:
+                        break
+                    new_offset += 1
+                token = (Tokens.error, source[offset:new_offset])
             tokens.append(token)
+            offset = new_offset
     return tokens
 
 
@@ -105,7 +119,7 @@ def minificate(tokens, keywords):
 
 
 def tokens_to_str(tokens, keywords):
-    result = [(Tokens.newline, "\n")]
+    result, keywords = [(Tokens.newline, "\n")], keyword_trie(keywords)
     for t in tokens:
         if parse(result[-1][1] + t[1], keywords) != [result[-1], t]:
             result.append((None, " "))
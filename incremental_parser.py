@@ -0,0 +1,221 @@
+import re
+from typing import Any, Callable, Iterator
+from compact_table import ACCEPT, ERROR, CompactTable
+from grammar import Rule
+from lexer import compile_patterns, pattern_matcher
+
+
+class SyntaxNode:
+    # Positions are relative: a node only knows its length, the padding is the skipped text in
+    # front of a token. The state is the LR state below the node, a subtree can be shifted as a
+    # whole when the parser reaches it in the same state with the same next token.
+    __slots__ = (
+        "symbol", "rule", "children", "length", "padding", "first", "state", "text", "memo"
+    )
+
+    def __init__(self, symbol: int, rule: int, children: tuple | None, length: int, first: int):
+        self.symbol, self.rule, self.children, self.length, self.first = (
+            symbol, rule, children, length, first
+        )
+        self.padding, self.state, self.text, self.memo = 0, 0, "", None
+
+
+def split(
+    root: SyntaxNode, lo: int, hi: int
+) -> tuple[list[tuple[SyntaxNode, int]], list[tuple[SyntaxNode, int]]]:
+    # maximal subtrees in front of lo and behind hi with their start positions
+    left, right, stack = [], [], [(root, 0)]
+    while stack:
+        node, start = stack.pop()
+        if node.length == 0:
+            continue
+        if start + node.length <= lo:
+            left.append((node, start))
+        elif start >= hi:
+            right.append((node, start))
+        elif node.children is not None:
+            for child, child_start in reversed(list(children_with_starts(node, start))):
+                stack.append((child, child_start))
+    return left, right
+
+
+def children_with_starts(node: SyntaxNode, start: int) -> Iterator[tuple[SyntaxNode, int]]:
+    for child in node.children:
+        yield child, start
+        start += child.length
+
+
+def leaves_from(root: SyntaxNode, position: int) -> Iterator[tuple[SyntaxNode, int]]:
+    # leaves that end after the position, in order
+    stack = [(root, 0)]
+    while stack:
+        node, start = stack.pop()
+        if start + node.length <= position:
+            continue
+        if node.children is None:
+            yield node, start
+        else:
+            stack.extend(reversed(list(children_with_starts(node, start))))
+
+
+def leaf_start(root: SyntaxNode, position: int) -> int:
+    # start of the token that contains the position or of the last token in front of it
+    node, start = root, 0
+    while node.children is not None:
+        last = None
+        for child, child_start in children_with_starts(node, start):
+            if child.length and child_start <= position:
+                last = child, child_start
+        if last is None:
+            return start
+        node, start = last
+    return start
+
+
+class IncrementalParser:
+    # Keeps the syntax tree of the text between edits. After an edit only the tokens around it
+    # are scanned again, and the parser shifts unchanged subtrees instead of their tokens.
+    def __init__(
+        self,
+        table: CompactTable,
+        postprocessings: dict[Rule, Callable],
+        patterns: dict[str | re.Pattern, None | Callable],
+    ):
+        self.table, self.recognizers = table, compile_patterns(patterns)
+        self.match = pattern_matcher(self.recognizers)
+        self.callbacks = [None] + [
+            postprocessings.get(rule, lambda *x, head=rule.head: (head, *x))
+            for rule in table.rules[1:]
+        ]
+        self.text, self.root = "", None
+
+    def scan(self, text: str, i: int) -> SyntaxNode | None:
+        # next token with the skipped text in front of it as padding, None at the end of text
+        start = i
+        while i < len(text):
+            if (found := self.match(text, i)) is None:
+                raise ValueError(f"Unexpected character: {repr(text[i])}")
+            match, k = found
+            if (postprocessing := self.recognizers[k][1]) is None:
+                i = match.end()
+                continue
+            token_type, _ = postprocessing(match.span(), match[0])
+            symbol = self.table.symbol_ids.get(token_type, len(self.table.symbols))
+            leaf = SyntaxNode(symbol, k, None, match.end() - start, symbol)
+            leaf.padding, leaf.text = i - start, match[0]
+            return leaf
+        return None
+
+    def reset(self, text: str):
+        self.text, self.root = "", None
+        self.edit(0, 0, text)
+
+    def edit(self, start: int, end: int, text: str):
+        # replaces self.text[start:end] with the text
+        old_text, self.text = self.text, self.text[:start] + text + self.text[end:]
+        delta, new_end = len(text) - (end - start), start + len(text)
+        if self.root is None:
+            lo, old = 0, iter(())
+        else:
+            # the token in front of the edit could grow, scanning starts one more token earlier
+            lo = leaf_start(self.root, position) if (position := start - 1) >= 0 else 0
+            lo = leaf_start(self.root, lo - 1) if lo > 0 else 0
+            old = leaves_from(self.root, end)
+        try:
+            new_leaves, i, sync = [], lo, len(old_text)
+            old_leaf, old_start = next(old, (None, 0))
+            while (leaf := self.scan(self.text, i)) is not None:
+                if i >= new_end:
+                    while old_leaf is not None and old_start + delta < i:
+                        old_leaf, old_start = next(old, (None, 0))
+                    if (
+                        old_leaf is not None and old_start + delta == i
+                        and (old_leaf.symbol, old_leaf.text, old_leaf.padding)
+                        == (leaf.symbol, leaf.text, leaf.padding)
+                    ):
+                        sync = old_start
+                        break
+                new_leaves.append((leaf, None))
+                i += leaf.length
+            left, right = split(self.root, lo, sync) if self.root is not None else ([], [])
+            self.root = self.parse(left + new_leaves + right, lo, sync)
+        except ValueError:
+            self.root = None  # the text does not parse, the next edit starts from scratch
+            raise
+
+    def parse(self, items: list[tuple[SyntaxNode, int | None]], lo: int, hi: int) -> SyntaxNode:
+        table, pending = self.table, items[::-1]
+        states, nodes = [0], [None]
+        while True:
+            node, start = pending[-1] if pending else (None, None)
+            if node is not None and node.children is not None:
+                # A subtree is shifted before the action on its first token, which can be the
+                # reduction of an empty rule inside it like at the start of a repetition. One
+                # that touches the edit is split at once, before such a reduction.
+                unchanged = start is not None and (start + node.length < lo or start >= hi)
+                if unchanged and node.state == states[-1]:
+                    pending.pop()
+                    states.append(table.goto(states[-1], node.symbol))
+                    nodes.append(node)
+                    continue
+                if not unchanged:
+                    self.split_pending(pending)
+                    continue
+            action = table.action(states[-1], node.first if node is not None else 0)
+            if action < ACCEPT:
+                rule = -action - 1
+                length = table.rule_lengths[rule]
+                children = tuple(nodes[len(nodes) - length:])
+                first = next((c.first for c in children if c.length), None)
+                parent = SyntaxNode(
+                    table.rule_heads[rule], rule, children, sum(c.length for c in children), first
+                )
+                del states[len(states) - length:], nodes[len(nodes) - length:]
+                parent.state = states[-1]
+                states.append(table.goto(states[-1], parent.symbol))
+                nodes.append(parent)
+            elif action == ACCEPT:
+                return nodes[-1]
+            elif action == ERROR:
+                symbol = node.first if node is not None else 0
+                token_type = table.symbols[symbol] if symbol < len(table.symbols) else None
+                raise ValueError("Unexpected token: " + repr(token_type))
+            elif node.children is None:
+                pending.pop()
+                states.append(action)
+                nodes.append(node)
+            else:
+                self.split_pending(pending)
+
+    @staticmethod
+    def split_pending(pending: list[tuple[SyntaxNode, int | None]]):
+        # replaces the subtree on top of the pending items by its children
+        node, start = pending.pop()
+        for child, child_start in reversed(list(children_with_starts(node, start or 0))):
+            if child.length:
+                pending.append((child, child_start if start is not None else None))
+
+    def value(self) -> Any:
+        # values are memoized by position, so only subtrees that moved or changed are evaluated
+        if self.root is None:
+            raise ValueError("Nothing parsed")
+        stack, values = [(self.root, 0, False)], []
+        while stack:
+            node, start, expanded = stack.pop()
+            if node.memo is not None and node.memo[0] == start:
+                values.append(node.memo[1])
+            elif node.children is None:
+                span = (start + node.padding, start + node.length)
+                _, value = self.recognizers[node.rule][1](span, node.text)
+                node.memo = (start, value)
+                values.append(value)
+            elif not expanded:
+                stack.append((node, start, True))
+                children = reversed(list(children_with_starts(node, start)))
+                stack.extend((child, child_start, False) for child, child_start in children)
+            else:
+                arguments = values[len(values) - len(node.children):]
+                del values[len(values) - len(node.children):]
+                node.memo = (start, self.callbacks[node.rule](*arguments))
+                values.append(node.memo[1])
+        return values[-1]
@@ -0,0 +1,71 @@
+import marshal
+from typing import Callable, Iterable
+from grammar import Grammar, Rule
+from libs.advanced_collections_v151 import MutableIndexedSet
+
+ALGORITHMS = ("slr", "clr")  # LALR and Pager's method need the whole automaton for lookaheads
+
+
+class LazyRows(dict):
+    # a row that is not there yet is made the first time the parser looks it up
+    __slots__ = ("make_rows",)
+
+    def __init__(self, make_rows: Callable[[int], None]):
+        super().__init__()
+        self.make_rows = make_rows
+
+    def __missing__(self, state: int) -> dict[str | None, int]:
+        self.make_rows(state)
+        return self[state]
+
+
+class LazyTable:
+    # An LR automaton that is built while parsing: a state is closed and gets its rows of
+    # actions and gotos the first time the parser reaches it, so startup does not depend on the
+    # size of the grammar and memory on the states the inputs use. Codes are those of
+    # CompactTable, rule 0 is the root rule, conflicts are found when their state is reached.
+    __slots__ = (
+        "algorithm", "grammar", "closure", "rule_ids", "kernels", "actions", "gotos",
+    )
+
+    def __init__(self, rules: Iterable[tuple[str, tuple[str, ...]]], algorithm: str = "clr"):
+        assert algorithm in ALGORITHMS, "Unknown algorithm: " + algorithm
+        self.algorithm, self.grammar = algorithm, Grammar(rules)
+        self.closure = self.grammar.lr1_closure if algorithm == "clr" else self.grammar.lr0_closure
+        self.rule_ids = {rule: i for i, rule in enumerate(self.grammar.item_rules)}
+        self.kernels = MutableIndexedSet([(0,)])  # the root item
+        self.actions, self.gotos = LazyRows(self.make_rows), LazyRows(self.make_rows)
+
+    def make_rows(self, state: int):
+        grammar, actions, gotos = self.grammar, {}, {}
+        item_set = self.closure(self.kernels[state])
+        for symbol, kernel in grammar.goto_kernels(item_set):
+            j = self.kernels.push(kernel)
+            (actions if symbol in grammar.terminals else gotos)[symbol] = j
+        for rule, follower in grammar.reductions(item_set):
+            if self.algorithm == "slr":
+                followers = grammar.followers.get(rule.head, (None,))
+            else:
+                followers = (follower,)
+            for follower in followers:
+                assert follower not in actions, "Conflict!"
+                actions[follower] = -self.rule_ids[rule] - 1
+        self.actions[state], self.gotos[state] = actions, gotos
+
+    @property
+    def rules(self) -> list[Rule]:
+        return self.grammar.item_rules
+
+    def to_bytes(self) -> bytes:
+        # the states made so far and the kernels of the states they lead to
+        rules = [(head, tuple(body)) for head, body in self.rules[1:]]
+        rows = dict(self.actions), dict(self.gotos)
+        return marshal.dumps((self.algorithm, rules, list(self.kernels), *rows))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LazyTable":
+        algorithm, rules, kernels, actions, gotos = marshal.loads(data)
+        table = cls(rules, algorithm)
+        table.kernels = MutableIndexedSet(kernels)
+        table.actions.update(actions), table.gotos.update(gotos)
+        return table
@@ -1,58 +1,426 @@
 import re
+from array import array
 from string import ascii_letters, digits, whitespace
-from typing import Callable
+from typing import Any, Callable, Iterator
 
 
-def get_very_simple_lexer(punctuation=set(), variable_characters=None):
+def get_very_simple_lexer(punctuation=set(), variable_characters=None, on_error=None):
     if variable_characters is None:
         variable_characters = ascii_letters + digits + " "
+    # for bytes-like sources the classes also hold the codes of the ASCII characters
+    punctuation, spaces, quotes, digit_chars, variable_characters = classes = [
+        {*chars, *(ord(c) for c in chars if c.isascii())}
+        for chars in (punctuation, whitespace, "'\"", digits, variable_characters)
+    ]
+    known_chars = set().union(*classes)
 
-    def scan(source: str, i: int = 0):
+    def scan(source, i: int = 0):
+        binary = not isinstance(source, str)
         while i < len(source):
             char = source[i]
             if char in punctuation:
                 i += 1
-                yield (char, char)
-            elif char in whitespace:
+                yield (chr(char), chr(char)) if binary else (char, char)
+            elif char in spaces:
                 i += 1
-            elif char in "'\"":
+            elif char in quotes:
                 j = i + 1
                 while j < len(source) and source[j] != char:
                     j += 1
-                yield ("terminal", source[i+1:j])
+                yield ("terminal", decode(source[i+1:j]))
                 i = j + 1
-            elif char in digits:
+            elif char in digit_chars:
                 j = i + 1
-                while j < len(source) and source[j] in digits:
+                while j < len(source) and source[j] in digit_chars:
                     j += 1
-                yield ("number", int(source[i:j]))
+                yield ("number", int(decode(source[i:j])))
                 i = j
             elif char in variable_characters:
                 j = i + 1
                 while j < len(source) and source[j] in variable_characters:
                     j += 1
-                yield ("identifier", source[i:j].strip())
+                yield ("identifier", decode(source[i:j]).strip())
                 i = j
+            elif on_error is None:
+                raise unexpected_character(source, i)
             else:
-                raise ValueError(f"Unexpected character: {repr(char)}")
+                # unknown characters up to the next token or space become one error token
+                j = i + 1
+                while j < len(source) and source[j] not in known_chars:
+                    j += 1
+                yield on_error((i, j), decode(source[i:j], "replace"))
+                i = j
         yield (None, None)
     return scan
 
 
-def construct_lexer(patterns: dict[str | re.Pattern, None | Callable]):
-    recognizers = [
+def compile_patterns(
+    patterns: dict[str | re.Pattern, None | Callable]
+) -> list[tuple[re.Pattern, None | Callable]]:
+    return [
         (re.compile(re.escape(pat)) if isinstance(pat, str) else pat, f)
         for pat, f in patterns.items()
     ]
 
+
+def encode_patterns(
+    recognizers: list[tuple[re.Pattern, None | Callable]]
+) -> list[tuple[re.Pattern, None | Callable]]:
+    # The patterns for bytes-like sources that hold UTF-8 text, matched byte by byte. Outside of
+    # literal text a non-ASCII character would stand for single bytes, so it is an error.
+    for regex, _ in recognizers:
+        if isinstance(regex.pattern, str) and literal(regex) is None and (
+            not regex.pattern.isascii() or re.search(r"\\([uUN]|x[89a-fA-F])", regex.pattern)
+        ):
+            raise ValueError("Pattern with non-ASCII characters for bytes: " + repr(regex.pattern))
+    return [
+        (re.compile(regex.pattern.encode(), regex.flags & ~re.UNICODE), f)
+        if isinstance(regex.pattern, str) else (regex, f)
+        for regex, f in recognizers
+    ]
+
+
+def decode(text: str | bytes, errors: str = "strict") -> str:
+    return text if isinstance(text, str) else str(text, "utf-8", errors)
+
+
+def token_text(match: re.Match) -> str:
+    # the text of a match, a byte that does not belong to valid UTF-8 is an unexpected character
+    try:
+        return decode(match.group())
+    except UnicodeDecodeError as error:
+        raise unexpected_character(match.string, match.start() + error.start) from None
+
+
+def literal(regex: re.Pattern) -> str | bytes | None:
+    # the text that a pattern without special characters matches, bytes patterns are handled
+    # as Latin-1 strings which keep every byte as one character
+    binary = not isinstance(regex.pattern, str)
+    pattern = regex.pattern.decode("latin-1") if binary else regex.pattern
+    text = re.sub(r"\\(.)", r"\1", pattern)
+    if text and regex.flags == (0 if binary else re.UNICODE) and re.escape(text) == pattern:
+        return text.encode("latin-1") if binary else text
+    return None
+
+
+def embedded_pattern(regex: re.Pattern) -> str | None:
+    # the pattern with its flags scoped to it, bytes patterns as Latin-1 strings. Patterns that
+    # refer to their own groups by number or use unscoped flags cannot be embedded.
+    binary = not isinstance(regex.pattern, str)
+    pattern = regex.pattern.decode("latin-1") if binary else regex.pattern
+    if re.search(r"\\[1-9]|\(\?\(", pattern):
+        return None
+    if regex.flags & ~(re.UNICODE | re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE):
+        return None
+    flags = "".join(f for flag, f in (
+        (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x")
+    ) if regex.flags & flag)
+    return f"(?{flags}:{pattern})" if flags else pattern
+
+
+def combine_patterns(recognizers: list[tuple[re.Pattern, None | Callable]]) -> re.Pattern | None:
+    # One alternation with a group around every pattern. Alternatives are tried in order, so the
+    # first pattern that matches wins as before, and lastindex is the group of that pattern.
+    alternatives, binary = [], bool(recognizers) and not isinstance(recognizers[0][0].pattern, str)
+    for regex, _ in recognizers:
+        if (pattern := embedded_pattern(regex)) is None:
+            return None
+        alternatives.append(f"({pattern})")
+    combined = "|".join(alternatives) or "(?!)"
+    try:
+        return re.compile(combined.encode("latin-1") if binary else combined)
+    except re.error:
+        return None
+
+
+def combine_lookaheads(recognizers: list[tuple[re.Pattern, None | Callable]]) -> re.Pattern | None:
+    # Every pattern in a lookahead with a group around it and an empty alternative, all tried
+    # at the position of the match. The match is empty, the groups tell how far each pattern
+    # reaches, so the longest one can win and not only the first one.
+    lookaheads, binary = [], bool(recognizers) and not isinstance(recognizers[0][0].pattern, str)
+    for regex, _ in recognizers:
+        if (pattern := embedded_pattern(regex)) is None:
+            return None
+        lookaheads.append(f"(?=({pattern})|)")
+    combined = "".join(lookaheads)
+    try:
+        return re.compile(combined.encode("latin-1") if binary else combined)
+    except re.error:
+        return None
+
+
+def dispatch_table(
+    recognizers: list[tuple[re.Pattern, None | Callable]]
+) -> dict[str | int | None, tuple[re.Pattern, list[int | None]]] | None:
+    # Combined patterns by the next character, or the next byte for bytes patterns. A literal is
+    # only tried where the text starts with its first character, other patterns everywhere, the
+    # None entry is for all other characters. Next to each combined pattern is the index of the
+    # original pattern by group number.
+    literals = [literal(regex) for regex, _ in recognizers]
+    table = {}
+    for char in [*dict.fromkeys(text[0] for text in literals if text), None]:
+        selected = [
+            k for k, text in enumerate(literals) if text is None or text[0] == char
+        ]
+        if (combined := combine_patterns([recognizers[k] for k in selected])) is None:
+            return None
+        indices = [None]
+        for k in selected:
+            indices += [k] + [None] * recognizers[k][0].groups
+        table[char] = combined, indices
+    return table
+
+
+def pattern_matcher(
+    recognizers: list[tuple[re.Pattern, None | Callable]]
+) -> Callable[[str, int], tuple[re.Match, int] | None]:
+    # the match of the first pattern that matches at a position and the index of the pattern
+    if (table := dispatch_table(recognizers)) is not None:
+        default = table[None]
+
+        def match_combined(source: str, i: int) -> tuple[re.Match, int] | None:
+            regex, indices = table.get(source[i], default)
+            if (match := regex.match(source, i)) is not None:
+                return match, indices[match.lastindex]
+        return match_combined
+
+    def match_first(source: str, i: int) -> tuple[re.Match, int] | None:
+        for k, (regex, _) in enumerate(recognizers):
+            if match := regex.match(source, i):
+                return match, k
+    return match_first
+
+
+def resynchronizer(
+    recognizers: list[tuple[re.Pattern, None | Callable]]
+) -> Callable[[str, int], int]:
+    # the next position where one of the patterns matches, the end of the source if there is none
+    if (combined := combine_patterns(recognizers)) is not None:
+        def search_combined(source: str, i: int) -> int:
+            return match.start() if (match := combined.search(source, i)) else len(source)
+        return search_combined
+    match = pattern_matcher(recognizers)
+
+    def search(source: str, i: int) -> int:
+        while i < len(source) and match(source, i) is None:
+            i += 1
+        return i
+    return search
+
+
+def unexpected_character(source, i: int) -> ValueError:
+    char = source[i] if isinstance(source, str) else bytes(source[i:i + 1])
+    return ValueError(f"Unexpected character: {repr(char)}")
+
+
+def by_source_type(recognizers: list[tuple[re.Pattern, None | Callable]], scanner: Callable):
+    # Sources can be strings or bytes-like objects such as mmap objects of large files. Scanners
+    # are made from the patterns for the type of the source when it is first scanned.
+    scanners = {}
+
+    def scan(source, i: int = 0, *args):
+        binary = not isinstance(source, str)
+        if (scan_source := scanners.get(binary)) is None:
+            scan_source = scanners[binary] = scanner(
+                encode_patterns(recognizers) if binary else recognizers
+            )
+        return scan_source(source, i, *args)
+    return scan
+
+
+def pattern_scanner(
+    recognizers: list[tuple[re.Pattern, None | Callable]], on_error: Callable | None = None
+):
+    next_start = resynchronizer(recognizers)
+    if (table := dispatch_table(recognizers)) is not None:
+        table = {
+            char: (regex, [recognizers[k][1] if k is not None else None for k in indices])
+            for char, (regex, indices) in table.items()
+        }
+        default = table[None]
+
+        def scan_combined(source: str, i: int = 0):
+            while i < len(source):
+                regex, postprocessings = table.get(source[i], default)
+                if (match := regex.match(source, i)) is None:
+                    if on_error is None:
+                        raise unexpected_character(source, i)
+                    j = next_start(source, i + 1)
+                    yield on_error((i, j), decode(source[i:j], "replace"))
+                    i = j
+                    continue
+                if (postprocessing := postprocessings[match.lastindex]) is not None:
+                    yield postprocessing(match.span(), token_text(match))
+                i = match.end()
+        return scan_combined
+
     def scan(source: str, i: int = 0):
         while i < len(source):
             for regex, postprocessing in recognizers:
                 if match := regex.match(source, i):
                     if postprocessing is not None:
-                        yield postprocessing(match.span(), match.group())
+                        yield postprocessing(match.span(), token_text(match))
                     i = match.end()
                     break
             else:
-                raise ValueError(f"Unexpected character: {repr(source[i])}")
+                if on_error is None:
+                    raise unexpected_character(source, i)
+                j = next_start(source, i + 1)
+                yield on_error((i, j), decode(source[i:j], "replace"))
+                i = j
     return scan
+
+
+def construct_lexer(
+    patterns: dict[str | re.Pattern, None | Callable], on_error: Callable | None = None
+):
+    # Spans of tokens from bytes-like sources are byte offsets. Without on_error an unexpected
+    # character raises ValueError, with it the text up to the next position where a pattern
+    # matches becomes a token made by on_error from its span and text, and scanning goes on.
+    return by_source_type(
+        compile_patterns(patterns), lambda recognizers: pattern_scanner(recognizers, on_error)
+    )
+
+
+class TokenArray:
+    # Tokens in parallel arrays of type ids and offsets instead of one tuple per token. A value is
+    # only made from the text of its token when it is asked for, iterating gives the same
+    # (token type, value) pairs as the other lexers. The source can be a bytes-like object, then
+    # the offsets are byte offsets and texts are decoded from UTF-8 when they are asked for.
+    # Scanning stopped at the end offset, behind the last token and the skipped text after it.
+    __slots__ = ("source", "type_names", "value_functions", "types", "starts", "ends", "end")
+
+    def __init__(
+        self, source, type_names: list[str], value_functions: dict[str, Callable] = {}
+    ):
+        self.source, self.type_names, self.value_functions = source, type_names, value_functions
+        self.types, self.starts, self.ends = array("i"), array("q"), array("q")
+        self.end = 0
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return zip(map(self.type_names.__getitem__, self.types), self.values())
+
+    def token_type(self, i: int) -> str:
+        return self.type_names[self.types[i]]
+
+    def text(self, i: int) -> str:
+        return decode(self.source[self.starts[i]:self.ends[i]], "replace")
+
+    def value(self, i: int) -> Any:
+        start, end = self.starts[i], self.ends[i]
+        if (f := self.value_functions.get(self.type_names[self.types[i]])) is None:
+            return self.text(i)
+        return f((start, end), self.text(i))
+
+    def values(self) -> Iterator[Any]:
+        source, starts, ends = self.source, self.starts, self.ends
+        functions = [self.value_functions.get(name) for name in self.type_names]
+        binary = not isinstance(source, str)
+        for type_id, start, end in zip(self.types, starts, ends):
+            text = str(source[start:end], "utf-8", "replace") if binary else source[start:end]
+            if (f := functions[type_id]) is None:
+                yield text
+            else:
+                yield f((start, end), text)
+
+
+def construct_array_lexer(
+    patterns: dict[str | re.Pattern, str | None],
+    value_functions: dict[str, Callable[[tuple[int, int], str], Any]] = {},
+    error_type: str | None = None,
+) -> Callable[..., TokenArray]:
+    # Patterns map to token types instead of postprocessings, None is skipped text, values are
+    # made by the value functions of token types from spans and texts, the text by default.
+    # Scanning stops at the first match that starts at or after the stop offset. With an error
+    # type, text that no pattern matches becomes a token of that type instead of an error.
+    type_names = list(dict.fromkeys(
+        [t for t in patterns.values() if t is not None] + [error_type] * (error_type is not None)
+    ))
+    error_id = type_names.index(error_type) if error_type is not None else None
+
+    def array_scanner(recognizers: list[tuple[re.Pattern, str | None]]):
+        type_ids = [None if t is None else type_names.index(t) for _, t in recognizers]
+        next_start = resynchronizer(recognizers)
+        if (table := dispatch_table(recognizers)) is not None:
+            table = {
+                char: (regex, [type_ids[k] if k is not None else None for k in indices])
+                for char, (regex, indices) in table.items()
+            }
+            default = table[None]
+
+            def scan_combined(source: str, i: int = 0, stop: int | None = None) -> TokenArray:
+                tokens = TokenArray(source, type_names, value_functions)
+                types, starts, ends = tokens.types, tokens.starts, tokens.ends
+                stop = len(source) if stop is None else min(stop, len(source))
+                while i < stop:
+                    regex, group_types = table.get(source[i], default)
+                    if (match := regex.match(source, i)) is not None:
+                        j, type_id = match.end(), group_types[match.lastindex]
+                    elif error_id is None:
+                        raise unexpected_character(source, i)
+                    else:
+                        j, type_id = next_start(source, i + 1), error_id
+                    if type_id is not None:
+                        types.append(type_id), starts.append(i), ends.append(j)
+                    i = j
+                tokens.end = i
+                return tokens
+            return scan_combined
+
+        def scan(source: str, i: int = 0, stop: int | None = None) -> TokenArray:
+            tokens = TokenArray(source, type_names, value_functions)
+            stop = len(source) if stop is None else min(stop, len(source))
+            while i < stop:
+                for k, (regex, _) in enumerate(recognizers):
+                    if match := regex.match(source, i):
+                        if (type_id := type_ids[k]) is not None:
+                            tokens.types.append(type_id)
+                            tokens.starts.append(i), tokens.ends.append(match.end())
+                        i = match.end()
+                        break
+                else:
+                    if error_id is None:
+                        raise unexpected_character(source, i)
+                    j = next_start(source, i + 1)
+                    tokens.types.append(error_id), tokens.starts.append(i), tokens.ends.append(j)
+                    i = j
+            tokens.end = i
+            return tokens
+        return scan
+    return by_source_type(compile_patterns(patterns), array_scanner)
+
+
+class PushLexer:
+    # Scans text that arrives in chunks. The match at the end of the buffered text could continue
+    # in the next chunk, and the complete match before it could have been cut short by a pattern
+    # looking ahead into the text of that last match, so both wait for more text.
+    def __init__(self, patterns: dict[str | re.Pattern, None | Callable]):
+        self.recognizers = compile_patterns(patterns)
+        self.match = pattern_matcher(self.recognizers)
+        self.buffer, self.offset = "", 0
+
+    def feed(self, text: str, final: bool = False) -> list:
+        buffer, i, matches = self.buffer + text, 0, []
+        while i < len(buffer):
+            if (found := self.match(buffer, i)) is None:
+                if final:
+                    raise ValueError(f"Unexpected character: {repr(buffer[i])}")
+                break
+            match, k = found
+            if match.end() == len(buffer) and not final:
+                break
+            matches.append((match, self.recognizers[k][1]))
+            i = match.end()
+        if matches and not final:
+            i = matches.pop()[0].start()
+        self.buffer, self.offset, offset = buffer[i:], self.offset + i, self.offset
+        return [
+            postprocessing((match.start() + offset, match.end() + offset), match[0])
+            for match, postprocessing in matches if postprocessing is not None
+        ]
+
+    def close(self) -> list:
+        return self.feed("", final=True)
@@ -1,3 +1,6 @@
+from typing import Iterable, Iterator
+
+
 def split_str(string: str, sep: str, maxsplit: int = -1) -> tuple[str, ...]:
     result = []
     # for is_space, word in groupby(string.split(sep, maxsplit), lambda w: w == ""):
@@ -6,3 +9,37 @@ def split_str(string: str, sep: str, maxsplit: int = -1) -> tuple[str, ...]:
             word = [result.pop() + 1]
         result.append(word or 0)
     return [x if isinstance(x, str) else sep * x for x in result]
+
+
+class LiteralTrie:
+    # Nested dicts by character, a literal is stored under the key None of the node where it
+    # ends. The longest literal at a position is found in one pass without slicing the source.
+    __slots__ = ("root", "literals")
+
+    def __init__(self, literals: Iterable[str] = ()):
+        self.root, self.literals = {}, tuple(dict.fromkeys(literals))
+        for literal in self.literals:
+            node = self.root
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[None] = literal
+
+    def __contains__(self, literal: str) -> bool:
+        node = self.root
+        for char in literal:
+            if (node := node.get(char)) is None:
+                return False
+        return None in node
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.literals)
+
+    def __len__(self) -> int:
+        return len(self.literals)
+
+    def longest(self, source: str, i: int = 0) -> str | None:
+        node, result, n = self.root, self.root.get(None), len(source)
+        while i < n and (node := node.get(source[i])) is not None:
+            i += 1
+            result = node.get(None, result)
+        return result
@@ -0,0 +1,74 @@
+import re
+from bisect import bisect_left
+from itertools import pairwise
+from mmap import ACCESS_READ, mmap
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Callable
+from lexer import TokenArray, construct_array_lexer
+
+# Chunks of a file are scanned speculatively in worker processes, every chunk from the start of
+# a line. Scanning is a function of the position alone, so a chunk agrees with scanning the file
+# in one go from the first token that the previous chunks end at. The tokens in front of it are
+# dropped, and a chunk that never meets the previous chunks is scanned again from where they end.
+worker = {}
+
+
+def open_source(path: str | Path) -> mmap | bytes:
+    with open(path, "rb") as file:
+        # empty files cannot be mapped
+        return mmap(file.fileno(), 0, access=ACCESS_READ) if file.seek(0, 2) else b""
+
+
+def start_worker(
+    patterns: dict[str | re.Pattern, str | None], path: str, error_type: str | None
+):
+    worker["scan"] = construct_array_lexer(patterns, error_type=error_type)
+    worker["source"] = open_source(path)
+
+
+def scan_chunk(bounds: tuple[int, int]) -> tuple | None:
+    try:
+        tokens = worker["scan"](worker["source"], *bounds)
+    except ValueError:
+        return None  # the chunk could start inside a token that the scanner cannot start with
+    return tokens.types, tokens.starts, tokens.ends, tokens.end
+
+
+def chunk_bounds(source: mmap | bytes, chunk_size: int) -> list[int]:
+    bounds = [0]
+    while (k := source.find(b"\n", bounds[-1] + chunk_size)) != -1 and k + 1 < len(source):
+        bounds.append(k + 1)
+    return bounds + [len(source)]
+
+
+def scan_file(
+    patterns: dict[str | re.Pattern, str | None],
+    path: str | Path,
+    value_functions: dict[str, Callable[[tuple[int, int], str], Any]] = {},
+    processes: int | None = None,
+    chunk_size: int = 1 << 22,
+    error_type: str | None = None,
+) -> TokenArray:
+    # the tokens of a memory mapped file as from construct_array_lexer, scanned in processes
+    scan = construct_array_lexer(patterns, value_functions, error_type)
+    source = open_source(path)
+    bounds = chunk_bounds(source, chunk_size)
+    if len(bounds) == 2 or processes == 1:
+        return scan(source)
+    with Pool(processes, start_worker, (patterns, str(path), error_type)) as pool:
+        chunks = pool.map(scan_chunk, pairwise(bounds))
+    tokens = scan(source, 0, 0)  # empty, with the type names of the patterns
+    for (start, stop), chunk in zip(pairwise(bounds), chunks):
+        k = 0
+        if chunk is not None and tokens.end != start:
+            k = bisect_left(chunk[1], tokens.end)
+            if k == len(chunk[1]) or chunk[1][k] != tokens.end:
+                chunk = None
+        if chunk is None:
+            rescanned, k = scan(source, tokens.end, stop), 0
+            chunk = rescanned.types, rescanned.starts, rescanned.ends, rescanned.end
+        types, starts, ends, tokens.end = chunk
+        tokens.types.extend(types[k:]), tokens.starts.extend(starts[k:])
+        tokens.ends.extend(ends[k:])
+    return tokens
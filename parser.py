@@ -1,27 +1,37 @@
-from typing import Callable
+from typing import Callable, Iterable
 from grammar import Rule, Grammar
 from contextlib import suppress as suppress_exception
-from clr_parser import parse
+from clr_parser import parse_compact
+from compact_table import CompactTable
+from glr_parser import deterministic_table, parse as parse_glr
+from table_cache import cached_table
+
+
+def lr_table(rules: Iterable[Rule]) -> CompactTable:
+    # the smallest deterministic table of the grammar
+    rules = list(rules)
+    for algorithm in ("slr", "lalr", "pager", "clr"):
+        with suppress_exception(ValueError | AssertionError):
+            return cached_table(rules, algorithm)
+    raise ValueError("Grammar is not LR(1)")
 
 
 def lr_parser(rules: dict[Rule, Callable] | list[Rule]) -> Callable:
-    grammar = Grammar(rules.keys() if isinstance(rules, dict) else rules)
+    grammar_rules = list(rules.keys() if isinstance(rules, dict) else rules)
     rules = rules if isinstance(rules, dict) else {}
-    with suppress_exception(ValueError | AssertionError):
-        actions, gotos = grammar.construct_slr_parsing_table()
-        return lambda source: parse(actions, gotos, rules, source)
-    with suppress_exception(ValueError | AssertionError):
-        actions, gotos = grammar.construct_lalr_parsing_table()
-        return lambda source: parse(actions, gotos, rules, source)
-    with suppress_exception(ValueError | AssertionError):
-        actions, gotos = grammar.construct_clr_parsing_table()
-        return lambda source: parse(actions, gotos, rules, source)
-    raise ValueError("Grammar is too complex")
+    with suppress_exception(ValueError):
+        table = lr_table(grammar_rules)
+        return lambda source: parse_compact(table, rules, source)
+    actions, gotos = Grammar(grammar_rules).construct_glr_parsing_table()
+    table = deterministic_table(actions, gotos)
+    return lambda source: parse_glr(actions, gotos, rules, source, table=table)
 
 
 def ast_to_str(ast) -> str:
-    (begin, end), head, *body = ast
-    header = f"{head} {begin}..{end-1}"
+    span, head, *body = ast
+    header = f"{head} {span[0]}..{span[1]-1}" if span is not None else head
+    # repetitions are lists of nodes, options that are left out are None
+    body = [x for b in body for x in (b if isinstance(b, list) else [b]) if x is not None]
     if not body:
         return header
     if len(body) == 1 and isinstance(body[0], str):
@@ -1,98 +1,199 @@
+import gc
 from functools import cached_property
-from itertools import chain, groupby
-from re import compile as compile_re
+from itertools import groupby, takewhile
+from re import Pattern, compile as compile_re, escape
 from typing import Any, Callable, NamedTuple
-from libs.list_utils import push_if_not_in
 from libs.string_utils import split_str
-from libs.advanced_collections_v151 import FrozenOrderedSet, GrowableOrderedSet
+from libs.advanced_collections_v151 import FrozenOrderedSet
+from compact_table import ACCEPT
+from grammar import Grammar
+from lexer import combine_lookaheads, embedded_pattern
+from parser import lr_table
 
 Rule = NamedTuple("Rule", head=str, body=tuple[str, ...])
-Node = NamedTuple("Node", span=str, value=Any)
-LR0Item = NamedTuple("LR0Item", dot=int, rule=Rule)
-LR1Item = NamedTuple("LR1Item", dot=int, rule=Rule, follower=str)
+Node = NamedTuple("Node", span=tuple[int, int], value=Any)
+skip_spaces = compile_re(r"\s*").match
+word = compile_re(r"\w+")  # the word token ""
+new_node = tuple.__new__  # Node(span, value) without the keyword handling of NamedTuple
 
 
 class Syntax:
     rules: dict[Rule, Callable[..., Any]]  # children nodes -> new node value
     nodes: dict[str, dict[Rule, Callable[..., Any]]]
     tokens: dict[str, Callable[[str, int], int]]
+    patterns: dict[str, Pattern]
+    literals: frozenset[str]
 
     def __init__(
         self, rules: dict[str | Rule, Callable[..., Any]],
-        tokens: dict[str, Callable[[str, int], int]] = {},
+        tokens: dict[str, Callable[[str, int], int] | Pattern | None] = {},
     ):
         self.rules = rules = {parse_rule(rule): f for rule, f in rules.items()}
         self.nodes = {n: dict(rs) for n, rs in groupby(rules.items(), lambda r: r[0].head)}
-        self.tokens = {
-            t: literal_scanner(t) for _, body in self.rules for t in body if t not in self.nodes
-        } | {token: f or literal_scanner(token) for token, f in tokens.items()}
+        # tokens given as regular expressions are matched by the parser without a scanner call
+        self.patterns = {token: f for token, f in tokens.items() if isinstance(f, Pattern)}
+        scanners = {
+            token: regex_scanner(f) if isinstance(f, Pattern) else f
+            for token, f in tokens.items() if f is not None
+        }
+        literals = [t for _, body in self.rules for t in body if t not in self.nodes] + [*tokens]
+        self.tokens = {t: scanners.get(t) or literal_scanner(t) for t in literals}
+        # literal tokens, the parser matches them longest first, "" is the word token
+        self.literals = frozenset(t for t in self.tokens if t not in scanners and t != "")
+        self.parsers: dict[str, Callable[[str], Node]] = {}
 
     def __str__(self):
         rules = ["rules:"] + [head + " -> " + " ".join(body) for head, body in self.rules]
         return "\n  ".join(rules) + "\ntokens: " + ", ".join(self.tokens)
 
     @cached_property
-    def get_prefixes(self) -> Callable[[str | tuple[str, ...]], FrozenOrderedSet[str | None]]:
-        # TODO: speed up the thing
-        prefixes = {tok: GrowableOrderedSet([tok]) for tok in self.tokens}
-        prefixes |= {node: GrowableOrderedSet() for node in self.nodes}
+    def grammar(self) -> Grammar:
+        return Grammar(self.rules, self.nodes, self.tokens)
 
+    @cached_property
+    def get_prefixes(self) -> Callable[[str | tuple[str, ...]], FrozenOrderedSet[str | None]]:
         def get_prefixes(body: str | tuple[str, ...]) -> FrozenOrderedSet[str | None]:
             if isinstance(body, str):
-                return FrozenOrderedSet(prefixes[body])
-            if len(body) == 0 or body[0] is None:
-                return FrozenOrderedSet([None])
-            if None not in prefixes[body[0]]:
-                return prefixes[body[0]]
-            return FrozenOrderedSet(prefixes[body[0]] - {None} | get_prefixes(body[1:]))
-
-        done = False
-        while not done:
-            done = True
-            for head, body in self.rules:
-                firsts = get_prefixes(body)
-                for first in filter(lambda f: f not in prefixes[head], firsts):
-                    prefixes[head].add(first)
-                    done = False
+                return FrozenOrderedSet(self.grammar.prefixes[body])
+            body = tuple(takewhile(lambda symbol: symbol is not None, body))
+            firsts, nullable = self.grammar.first_of_suffix(Rule(None, body), 0)
+            return FrozenOrderedSet(firsts + (None,) if nullable else firsts)
         return get_prefixes
 
-    def lr1_closure(self, core_items: set[LR1Item]) -> FrozenOrderedSet[LR1Item]:
-        item_set = GrowableOrderedSet(core_items)
-        for i, item_rule, follower in item_set:
-            # TODO: define function for tuple.get instead of this mess
-            for rule in self.nodes.get((item_rule.body + (None,))[i], []):
-                for follower in self.get_prefixes(item_rule.body[i+1:] + (follower,)):
-                    new_item = LR1Item(0, rule, follower)
-                    if new_item not in item_set:
-                        item_set.add(new_item)
-        return FrozenOrderedSet(item_set)
+    def parse(self, source: str, root_node: str) -> Node:
+        if root_node not in self.parsers:
+            self.parsers[root_node] = self.parser(root_node)
+        return self.parsers[root_node](source)
+
+    def parser(self, root_node: str) -> Callable[[str], Node]:
+        # Tokens are scanned when the parser needs the next one, and only the tokens with an
+        # action in the current state are tried. The longest token wins, literals win ties.
+        # A word can be a keyword where the keyword is expected and a name everywhere else.
+        rules = sorted(self.rules, key=lambda rule: rule.head != root_node)
+        table = lr_table(rules)  # the first rule gives the start symbol
+        reductions = [None] + [
+            (self.rules[rule] or (lambda *x, head=rule.head: (head, *x)), len(rule.body), head)
+            for rule, head in zip(table.rules[1:], table.rule_heads[1:])
+        ]
+        base, check, value = table.action_base, table.action_check, table.action_value
+        goto_base, goto_check, goto_value = table.goto_base, table.goto_check, table.goto_value
+        default_actions, default_gotos = table.default_actions, table.default_gotos
+        symbol_ids = table.symbol_ids
+        terminals = [(i, t) for i, t in enumerate(table.symbols) if t in self.tokens]
+        patterns = {t: word if t == "" else self.patterns.get(t) for t in self.tokens}
+        scanners, expected_sets = [], []
+        for state, default in enumerate(default_actions):
+            # the tokens of a default reduction are not in the table, they are in its follow set
+            followers = self.grammar.followers[table.rules[-default - 1].head] if default else ()
+            expected = [
+                (i, t) for i, t in terminals if check[base[state] + i] == state or t in followers
+            ]
+            # One pattern per state tries the literals, longest first, and the regular
+            # expressions at the same position, group k is recognizer k. The literals have no
+            # symbol, the token is looked up by its text. Patterns with groups and tokens given
+            # as functions are scanned apart.
+            literals = [t for _, t in expected if t in self.literals]
+            literals.sort(key=len, reverse=True)
+            recognizers = [(compile_re("|".join(map(escape, literals))), None)] if literals else []
+            recognizers += [
+                (patterns[t], i) for i, t in expected if t not in self.literals and patterns[t]
+                and not patterns[t].groups and embedded_pattern(patterns[t]) is not None
+            ]
+            if (combined := combine_lookaheads(recognizers)) is None:
+                recognizers = recognizers[:bool(literals)]
+                combined = combine_lookaheads(recognizers)
+            combined_symbols = {i for _, i in recognizers}
+            functions = [
+                (i, self.tokens[t]) for i, t in expected
+                if t not in self.literals and i not in combined_symbols
+            ]
+            scanners.append((combined.match, [None] + [i for _, i in recognizers], functions))
+            expected_sets.append(frozenset(i for i, _ in expected))
+        # by the state a token was scanned in, the tokens that other states keep
+        kept_sets = [{} for _ in expected_sets]
+
+        def parse_tree(source: str) -> Node:
+            states, nodes, top, n = [0] * 256, [None] * 256, 0, len(source)
+            symbol, end = -1, 0  # a negative symbol stands for a token that is not scanned yet
+            while True:
+                state = states[top]
+                if symbol > 0 and state != scanned_in:
+                    # The token was scanned before default reductions, among the followers of
+                    # their heads. It is kept if this state expects it and no token that was
+                    # not tried then, else a keyword could win where only a word is valid.
+                    if (kept := kept_sets[scanned_in].get(state)) is None:
+                        nested = expected_sets[state] <= expected_sets[scanned_in]
+                        kept = expected_sets[state] if nested else frozenset()
+                        kept_sets[scanned_in][state] = kept
+                    if symbol not in kept:
+                        symbol, end = -1, start
+                if symbol < 0:
+                    scanned_in, start = state, end
+                    if end < n and source[end].isspace():
+                        start = skip_spaces(source, end).end()
+                    match, group_symbols, functions = scanners[state]
+                    symbol, length = 0, 0
+                    if start < n:
+                        # groups that matched start here, the first one that reaches farthest wins
+                        spans = match(source, start).regs
+                        if (longest := max(spans))[1] > start:
+                            symbol = group_symbols[spans.index(longest)]
+                            if symbol is None:
+                                symbol = symbol_ids[source[start:longest[1]]]
+                            length = longest[1] - start
+                        for token_symbol, scanner in functions:
+                            if (k := scanner(source, start)) > length:
+                                symbol, length = token_symbol, k
+                        if not length:
+                            raise ValueError(f"Unexpected character: {repr(source[start])}")
+                    end = start + length
+                k = base[state] + symbol
+                action = value[k] if check[k] == state else default_actions[state]
+                if action > 0:
+                    top += 1
+                    if top == len(states):
+                        states.extend(states), nodes.extend(nodes)
+                    states[top] = action
+                    nodes[top] = new_node(Node, ((start, end), source[start:end]))
+                    symbol = -1
+                elif action < ACCEPT:
+                    callback, length, head = reductions[-action - 1]
+                    if length == 1:
+                        # chains of unit rules are common, their nodes share the span
+                        child = nodes[top]
+                        nodes[top] = new_node(Node, (child[0], callback(child)))
+                    else:
+                        if length:
+                            body = nodes[top - length + 1:top + 1]
+                            span = (body[0][0][0], body[-1][0][1])
+                        else:
+                            body, span = (), (start, start)
+                        top -= length - 1
+                        if top == len(states):
+                            states.extend(states), nodes.extend(nodes)
+                        nodes[top] = new_node(Node, (span, callback(*body)))
+                    k = goto_base[head] + states[top - 1]
+                    states[top] = goto_value[k] if goto_check[k] == head else default_gotos[head]
+                elif action == ACCEPT:
+                    return nodes[top]
+                else:
+                    raise ValueError("Unexpected token: " + repr(table.symbols[symbol]))
+
+        def parse(source: str) -> Node:
+            # The collector would walk the growing tree again and again, it runs afterwards.
+            # Nodes are tuples, the tree has no cycles.
+            if not gc.isenabled():
+                return parse_tree(source)
+            gc.disable()
+            try:
+                return parse_tree(source)
+            finally:
+                gc.enable()
+        return parse
 
     def get_clr_parsing_table(self, root_node: str):
-        gotos, actions = {}, {}
-        # TODO: use something more appropriate for queue
-        root_item = LR1Item(dot=0, rule=Rule(head=None, body=(root_node,)), follower=None)
-        item_sets = [FrozenOrderedSet([root_item])]
-        for i, item_set in enumerate(map(self.lr1_closure, item_sets)):
-            # TODO: use more efficient way to find next sets
-            for next_symbol in chain(self.nodes, self.tokens):
-                if next_set := FrozenOrderedSet(
-                    LR1Item(i + 1, rule, follower)
-                    for i, rule, follower in item_set
-                    if i < len(rule.body) and rule.body[i] == next_symbol
-                ):
-                    gotos[i, next_symbol] = push_if_not_in(item_sets, next_set)
-        for i, item_set in enumerate(map(self.lr1_closure, item_sets)):
-            for terminal, j in ((t, j) for t in self.tokens if (j := gotos.get((i, t)))):
-                assert (i, terminal) not in actions, "Conflict!"
-                actions[i, terminal] = ("shift", j)
-            for item in filter(lambda item: item.dot == len(item.rule.body), item_set):
-                if item.rule.head is not None:
-                    assert (i, item.follower) not in actions, "Conflict!"
-                    actions[i, item.follower] = ("reduce", item.rule)
-                elif item.follower is None:
-                    assert (i, None) not in actions, "Conflict!"
-                    actions[i, None] = ("accept",)
-        return actions, {k: v for k, v in gotos.items() if k[1] in self.nodes}
+        grammar = Grammar(self.rules, self.nodes, self.tokens, root_node)
+        return grammar.construct_clr_parsing_table()
 
 
 def parse_rule(source: str | tuple[str, tuple[str, ...]]) -> Rule:
@@ -103,8 +204,11 @@ def parse_rule(source: str | tuple[str, tuple[str, ...]]) -> Rule:
     return Rule(head, tuple(body))
 
 
+def regex_scanner(regex: Pattern) -> Callable[[str, int], int]:
+    return lambda source, i: match.end() - i if (match := regex.match(source, i)) else 0
+
+
 def literal_scanner(literal: str) -> Callable[[str, int], int]:
     if literal == "":
-        regex = compile_re(r"\w+")
-        return lambda s, i: regex.match(s, i).end - i
-    return lambda source, i: len(literal) if source[i:i+len(literal)] == literal else 0
+        return regex_scanner(word)
+    return lambda source, i: len(literal) if source.startswith(literal, i) else 0
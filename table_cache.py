@@ -0,0 +1,67 @@
+import os
+from contextlib import suppress
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterable
+from compact_table import CompactTable
+from grammar import Grammar, Rule
+from lazy_table import LazyTable
+
+FORMAT_VERSION = 2  # bump whenever table construction or serialization changes
+CONFLICT = b"conflict"
+
+
+def cache_directory() -> Path:
+    if directory := os.environ.get("GRAMMAR_CACHE_DIR"):
+        return Path(directory)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "grammar"
+
+
+def fingerprint(rules: Iterable[tuple[str, tuple[str, ...]]], algorithm: str) -> str:
+    # rule order matters, the head of the first rule is the start symbol
+    digest = sha256(f"{FORMAT_VERSION} {algorithm}".encode())
+    for head, body in rules:
+        digest.update(repr((head, tuple(body))).encode())
+    return digest.hexdigest()
+
+
+def store(path: Path, data: bytes):
+    # write to a temporary file first so that concurrent readers never see partial tables
+    with suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+
+def cached_table(rules: list[Rule], algorithm: str) -> CompactTable:
+    path = cache_directory() / f"{fingerprint(rules, algorithm)}.table"
+    try:
+        data = path.read_bytes()
+    except OSError:
+        data = None
+    if data == CONFLICT:
+        raise AssertionError("Conflict!")
+    if data is not None:
+        with suppress(EOFError, ValueError, TypeError):
+            return CompactTable.from_bytes(data)
+    try:
+        table = CompactTable(*getattr(Grammar(rules), f"construct_{algorithm}_parsing_table")())
+    except (ValueError, AssertionError):
+        store(path, CONFLICT)
+        raise
+    store(path, table.to_bytes())
+    return table
+
+
+def cached_lazy_table(rules: list[Rule], algorithm: str = "clr") -> LazyTable:
+    # starts with the states that earlier runs made and saved with save_lazy_table
+    path = cache_directory() / f"{fingerprint(rules, 'lazy ' + algorithm)}.lazy"
+    with suppress(OSError, EOFError, ValueError, TypeError):
+        return LazyTable.from_bytes(path.read_bytes())
+    return LazyTable(rules, algorithm)
+
+
+def save_lazy_table(table: LazyTable):
+    name = fingerprint(table.rules[1:], "lazy " + table.algorithm)
+    store(cache_directory() / f"{name}.lazy", table.to_bytes())
@@ -1,5 +1,9 @@
 from grammar import Grammar
-from clr_parser import parse as parse_clr
+from clr_parser import PushParser, integer_tables, parse as parse_clr, parse_compact
+from compact_table import CompactTable
+from lexer import construct_array_lexer
+from re import compile as re
+import pytest
 
 
 def test_simplest_case():
@@ -43,3 +47,105 @@ def test_very_simple_arithmetic():
     tokens = [("number", int(word)) if word.isdigit() else (word, word) for word in source.split()]
     result = parse_clr(*grammar.construct_clr_parsing_table(), rules, tokens)
     assert result == 1159
+
+
+def test_compact_table_parsing():
+    rules = {
+        ("sum", ("product",)): (lambda x: x),
+        ("sum", ("sum", "+", "product")): (lambda x, _, y: x + y),
+        ("product", ("number",)): (lambda x: x),
+        ("product", ("product", "*", "number")): (lambda x, _, y: x * y),
+    }
+    table = CompactTable(*Grammar(rules.keys()).construct_lalr_parsing_table())
+
+    def evaluate(source):
+        tokens = [("number", int(w)) if w.isdigit() else (w, w) for w in source.split()]
+        return parse_compact(table, rules, tokens)
+
+    assert evaluate("2 + 2 * 4") == 10
+    assert evaluate("2 * 123 + 32 * 321 * 908 + 21 * 32037") == 9999999
+    for invalid_source in ["2 +", "2 2", "2 - 2", ""]:
+        with pytest.raises(ValueError):
+            evaluate(invalid_source)
+
+
+def test_compact_table_with_empty_rules():
+    grammar = Grammar([("S", ("A", "x", "A")), ("A", ("a",)), ("A", ())])
+    table = CompactTable(*grammar.construct_lalr_parsing_table())
+    assert parse_compact(table, {}, [("x", "x")]) == ("S", ("A",), "x", ("A",))
+    assert parse_compact(table, {}, [("x", "x"), ("a", "a")]) == ("S", ("A",), "x", ("A", "a"))
+
+
+def test_empty_rules_and_deep_stacks():
+    grammar = Grammar([("S", ("A", "x", "A")), ("A", ("a",)), ("A", ())])
+    actions, gotos = grammar.construct_clr_parsing_table()
+    assert parse_clr(actions, gotos, {}, [("x", "x")]) == ("S", ("A",), "x", ("A",))
+    grammar = Grammar([("S", ("(", "S", ")")), ("S", ())])
+
+    def depth(*children):
+        return 1 + children[1] if children else 0
+
+    tokens = [("(", "(")] * 1000 + [(")", ")")] * 1000
+    rules = {("S", ("(", "S", ")")): depth, ("S", ()): depth}
+    assert parse_clr(*grammar.construct_clr_parsing_table(), rules, tokens) == 1000
+    table = CompactTable(*grammar.construct_lalr_parsing_table())
+    assert parse_compact(table, rules, tokens) == 1000
+
+
+def test_push_parser():
+    rules = {
+        ("sum", ("number",)): (lambda x: x),
+        ("sum", ("sum", "+", "number")): (lambda x, _, y: x + y),
+    }
+    actions, gotos = Grammar(rules.keys()).construct_lalr_parsing_table()
+    parser = PushParser(actions, gotos, rules)
+    assert parser.feed([("number", 1), ("+", "+")]) is None
+    assert parser.feed([]) is None
+    assert parser.feed([("number", 2), ("+", "+"), ("number", 3)]) is None
+    assert parser.close() == 6
+    parser = PushParser(actions, gotos, rules)
+    parser.feed([("number", 1)])
+    with pytest.raises(ValueError):
+        parser.feed([("number", 2)])
+
+
+def test_push_parser_reduces_eagerly():
+    lines = []
+    rules = {
+        ("log", ("line",)): (lambda _: None),
+        ("log", ("log", "line")): (lambda *_: None),
+        ("line", ("word", "newline")): (lambda word, _: lines.append(word)),
+    }
+    actions, gotos = Grammar(rules.keys()).construct_lalr_parsing_table()
+    parser = PushParser(actions, gotos, rules)
+    for i in range(1000):
+        parser.feed([("word", i), ("newline", None)])
+        assert len(lines) == i  # the line is reduced when the next one starts
+        assert parser.top <= 3
+    parser.close()
+    assert lines == list(range(1000))
+
+
+def test_token_arrays():
+    rules = {
+        ("sum", ("number",)): (lambda x: x),
+        ("sum", ("sum", "+", "number")): (lambda x, _, y: x + y),
+    }
+    actions, gotos = Grammar(rules.keys()).construct_lalr_parsing_table()
+    patterns = {" ": None, re(r"\d+"): "number", "+": "+"}
+    scan = construct_array_lexer(patterns, {"number": lambda _, s: int(s)})
+    tokens = scan("1 + 20 + 300")
+    assert parse_clr(actions, gotos, rules, tokens) == 321
+    assert parse_compact(CompactTable(actions, gotos), rules, tokens) == 321
+
+
+def test_converted_tables():
+    rules = {
+        ("sum", ("number",)): (lambda x: x),
+        ("sum", ("sum", "+", "number")): (lambda x, _, y: x + y),
+    }
+    actions, gotos = Grammar(rules.keys()).construct_lalr_parsing_table()
+    tokens = [("number", 1), ("+", "+"), ("number", 2)]
+    table = integer_tables(actions, gotos)
+    assert parse_clr(table, None, rules, tokens) == 3
+    assert parse_clr(actions, gotos, rules, tokens) == 3
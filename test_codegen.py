@@ -0,0 +1,45 @@
+from types import ModuleType
+from clr_parser import parse as parse_clr
+from codegen import generate_parser_module
+from grammar import Grammar
+import pytest
+
+
+def load_module(action_table, goto_table) -> ModuleType:
+    module = ModuleType("generated_parser")
+    exec(generate_parser_module(action_table, goto_table), module.__dict__)
+    return module
+
+
+def test_generated_arithmetic_parser():
+    rules = {
+        ("sum", ("product",)): (lambda x: x),
+        ("sum", ("sum", "+", "product")): (lambda x, _, y: x + y),
+        ("product", ("factor",)): (lambda x: x),
+        ("product", ("product", "*", "factor")): (lambda x, _, y: x * y),
+        ("factor", ("(", "sum", ")")): (lambda *x: x[1]),
+        ("factor", ("number",)): (lambda x: x),
+    }
+    tables = Grammar(rules.keys()).construct_lalr_parsing_table()
+    parse = load_module(*tables).parser(rules)
+
+    def scan(source):
+        return [("number", int(w)) if w.isdigit() else (w, w) for w in source.split()]
+
+    for source in ["2 + 2 * 4", "2 + 3 * 23 + ( 32 * 34 )", "( ( ( 1 ) ) )"]:
+        assert parse(scan(source)) == parse_clr(*tables, rules, scan(source))
+    for invalid_source in ["2 +", "2 2", "2 - 2", ""]:
+        with pytest.raises(ValueError):
+            parse(scan(invalid_source))
+
+
+def test_generated_parser_without_callbacks():
+    rules = [
+        ("S", ("A", "x", "A")), ("A", ("a", "a", "a", "a", "a")), ("A", ()),
+        ("A", ("b",)), ("A", ("c", "c")),
+    ]
+    tables = Grammar(rules).construct_clr_parsing_table()
+    parse = load_module(*tables).parser()
+    for source in ["x", "aaaaax", "xaaaaa", "bxcc", "ccxb"]:
+        tokens = [(char, char) for char in source]
+        assert parse(tokens) == parse_clr(*tables, {}, tokens)
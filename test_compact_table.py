@@ -0,0 +1,53 @@
+from grammar import Grammar, Rule
+from compact_table import ACCEPT, ERROR, CompactTable
+import pytest
+
+RULES = [
+    ("sum", ("product",)),
+    ("sum", ("sum", "+", "product")),
+    ("product", ("factor",)),
+    ("product", ("product", "*", "factor")),
+    ("factor", ("(", "sum", ")")),
+    ("factor", ("number",)),
+]
+
+
+def decode(table: CompactTable, code: int):
+    if code > 0:
+        return ("shift", code)
+    elif code == ACCEPT:
+        return ("accept",)
+    elif code < ACCEPT:
+        return ("reduce", table.rules[-code - 1])
+
+
+@pytest.mark.parametrize("algorithm", ["slr", "lalr", "clr"])
+def test_same_actions_and_gotos(algorithm):
+    actions, gotos = getattr(Grammar(RULES), f"construct_{algorithm}_parsing_table")()
+    table = CompactTable(actions, gotos)
+    states = {state for state, _ in actions}
+    for state in states:
+        for symbol, i in table.symbol_ids.items():
+            code = table.action(state, i)
+            if (state, symbol) in actions:
+                assert decode(table, code) == actions[state, symbol]
+            else:
+                assert code == ERROR or code == table.default_actions[state]
+    for (state, symbol), j in gotos.items():
+        assert table.goto(state, table.symbol_ids[symbol]) == j
+
+
+def test_default_reductions():
+    actions, gotos = Grammar(RULES).construct_slr_parsing_table()
+    table = CompactTable(actions, gotos)
+    reduce_by_id = ("reduce", Rule("factor", ("number",)))
+    state = next(state for (state, _), action in actions.items() if action == reduce_by_id)
+    assert decode(table, table.default_actions[state]) == reduce_by_id
+    assert len(table.action_check) < len(actions)
+
+
+def test_serialization():
+    table = CompactTable(*Grammar(RULES).construct_lalr_parsing_table())
+    loaded = CompactTable.from_bytes(table.to_bytes())
+    for name in CompactTable.__slots__:
+        assert getattr(loaded, name) == getattr(table, name)
@@ -1,12 +1,13 @@
 from ebnf import EBNF
 import pytest
 
-parse_arithmetic_expression = EBNF("""
+arithmetic_expression = EBNF("""
     sum = product | sum, "+", product | sum, "-", product;
     product = factor | product, "*", factor | product, "/", factor;
     factor = "(", sum, ")" | number;
     number = ?\\d+?;
-""").parse
+""")
+parse_arithmetic_expression = arithmetic_expression.parse
 
 
 @pytest.mark.parametrize("expr, expected_ast", [
@@ -54,3 +55,61 @@ parse_arithmetic_expression = EBNF("""
 def test_arithmetic_expression_parsing(expr, expected_ast):
     ast = parse_arithmetic_expression(expr)
     assert ast == expected_ast
+
+
+@pytest.mark.parametrize("expr", ["2+2", "7991*706", "(1-2)/3*(4)", "1+(2+(3+(4)))"])
+def test_syntax_parsing(expr):
+    # Syntax.parse builds the same tree from nodes, the tokens keep their text
+    def from_nodes(node):
+        if isinstance(node.value, str):
+            return node.value
+        head, *children = node.value
+        return (node.span, head, *map(from_nodes, children))
+
+    def from_ebnf(ast):
+        span, name, *children = ast
+        if name[0] in "\"?":
+            return children[0]
+        return (span, name, *map(from_ebnf, children))
+
+    syntax = arithmetic_expression.syntax()
+    assert from_nodes(syntax.parse(expr, "sum")) == from_ebnf(parse_arithmetic_expression(expr))
+    with pytest.raises(ValueError):
+        syntax.parse("2+", "sum")
+
+
+def test_options_and_repetitions():
+    grammar = EBNF("""
+        list = "[", [items], "]";
+        items = item, {",", item};
+        item = ?\\d+? | list | "-", ["+"], ?\\d+?;
+        pair = "(", [items], ",", [items], ")";
+    """)
+    # the same sub-expression is one shared variable, a repetition has no rule for its items
+    assert sum(head == "[items]" for head, _ in grammar.parsing_rules) == 2
+    assert ('{",", item}', ('{",", item}', '","', "item")) in grammar.parsing_rules
+    number = lambda i, text: ((i, i + len(text)), "?\\d+?", text)
+    comma, minus = lambda i: ((i, i + 1), '","', ","), lambda i: ((i, i + 1), '"-"', "-")
+    brackets = ((0, 1), '"["', "["), ((1, 2), '"]"', "]")
+    assert grammar.parse("[]") == ((0, 2), "list", brackets[0], None, brackets[1])
+    assert grammar.parse("[1,-2,3]") == (
+        (0, 8), "list", ((0, 1), '"["', "["),
+        ((1, 7), "items", ((1, 2), "item", number(1, "1")), [
+            ((2, 5), '(",", item)', comma(2), ((3, 5), "item", minus(3), None, number(4, "2"))),
+            ((5, 7), '(",", item)', comma(5), ((6, 7), "item", number(6, "3"))),
+        ]),
+        ((7, 8), '"]"', "]"),
+    )
+    parser = grammar.incremental_parser()
+    parser.reset("[1,[2]]")
+    assert parser.value() == grammar.parse("[1,[2]]")
+
+
+def test_ambiguous_grammar_with_repetitions():
+    grammar = EBNF("""
+        rules = {rule};
+        rule = ?[a-z]+?, "=", rhs, ";";
+        rhs = ?[a-z]+? | rhs, "|", rhs | "{", rhs, "}";
+    """)
+    ast = grammar.parse("a={b|c};d=e;")
+    assert ast[:2] == ((0, 12), "rules") and [rule[0] for rule in ast[2]] == [(0, 8), (8, 12)]
@@ -0,0 +1,64 @@
+from grammar import Grammar
+from clr_parser import parse as parse_clr
+from glr_parser import deterministic_table, parse as parse_glr, parse_forest
+import pytest
+
+
+def test_deterministic_grammar():
+    rules = {
+        ("sum", ("product",)): (lambda x: x),
+        ("sum", ("sum", "+", "product")): (lambda x, _, y: x + y),
+        ("product", ("number",)): (lambda x: x),
+        ("product", ("product", "*", "number")): (lambda x, _, y: x * y),
+    }
+    grammar = Grammar(rules.keys())
+    source = "2 * 123 + 32 * 321 * 908 + 21 * 32037"
+    tokens = [("number", int(w)) if w.isdigit() else (w, w) for w in source.split()]
+    assert parse_glr(*grammar.construct_glr_parsing_table(), rules, tokens) == 9999999
+    assert parse_glr(*grammar.construct_glr_parsing_table(), {}, tokens) == (
+        parse_clr(*grammar.construct_lalr_parsing_table(), {}, tokens)
+    )
+
+
+def test_ambiguous_grammar():
+    rules = {
+        ("expr", ("expr", "-", "expr")): (lambda x, _, y: x - y),
+        ("expr", ("number",)): (lambda x: x),
+    }
+    actions, gotos = Grammar(rules.keys()).construct_glr_parsing_table()
+    tokens = [("number", 8), ("-", "-"), ("number", 4), ("-", "-"), ("number", 2)]
+    forest = parse_forest(actions, gotos, tokens)
+    assert forest.span == (0, 5) and len(forest.families) == 2
+    results = {
+        parse_glr(actions, gotos, rules, tokens, lambda families: families[i]) for i in (0, -1)
+    }
+    assert results == {(8 - 4) - 2, 8 - (4 - 2)}
+    table = deterministic_table(actions, gotos)
+    assert parse_glr(actions, gotos, rules, tokens, table=table) in results
+
+
+def test_hidden_left_recursion():
+    grammar = Grammar([("S", ("A", "S", "b")), ("S", ("x",)), ("A", ())])
+    tokens = [(c, c) for c in "xbbb"]
+    ast = parse_glr(*grammar.construct_glr_parsing_table(), {}, tokens)
+    assert ast == ("S", ("A",), ("S", ("A",), ("S", ("A",), ("S", "x"), "b"), "b"), "b")
+
+
+def test_unexpected_token():
+    grammar = Grammar([("S", ("a", "S")), ("S", ("a",))])
+    with pytest.raises(ValueError):
+        parse_glr(*grammar.construct_glr_parsing_table(), {}, [("a", "a"), ("b", "b")])
+    with pytest.raises(ValueError):
+        parse_glr(*grammar.construct_glr_parsing_table(), {}, [])
+
+
+def test_nullable_and_cyclic_grammar():
+    # new edges are reduced only along the paths over them, this took seconds before
+    grammar = Grammar([("S", ("S", "S")), ("S", ("A",)), ("S", ("a",)), ("A", ())])
+    actions, gotos = grammar.construct_glr_parsing_table()
+    forest = parse_forest(actions, gotos, [("a", "a")] * 48)
+    assert forest.span == (0, 48) and len(forest.families) == 49
+    assert parse_glr(actions, gotos, {}, [("a", "a")] * 3) in {
+        ("S", ("S", ("S", "a"), ("S", "a")), ("S", "a")),
+        ("S", ("S", "a"), ("S", ("S", "a"), ("S", "a"))),
+    }
@@ -1,4 +1,5 @@
 from grammar import Grammar, Rule
+import pytest
 
 
 def test_prefixes():
@@ -31,6 +32,32 @@ def test_followers():
     assert Grammar(rules).followers == followers
 
 
+def test_nullable_prefixes_and_followers():
+    rules = [
+        ("S", ("A", "B", "c")),
+        ("A", ("B", "B")),
+        ("B", ("b",)),
+        ("B", ()),
+        ("C", ("C", "c")),
+    ]
+    grammar = Grammar(rules)
+    assert grammar.nullable == {"A", "B"}
+    assert grammar.prefixes == {
+        "S": {"b", "c"}, "A": {"b", None}, "B": {"b", None}, "C": set(),
+        "b": {"b"}, "c": {"c"},
+    }
+    assert grammar.followers == {
+        "S": {None}, "A": {"b", "c"}, "B": {"b", "c"}, "C": {"c"},
+        "b": {"b", "c"}, "c": {None, "c"},
+    }
+    rule = Rule("S", ("A", "B", "c"))
+    suffixes = [grammar.first_of_suffix(rule, i) for i in range(4)]
+    assert [(set(firsts), nullable) for firsts, nullable in suffixes] == [
+        ({"b", "c"}, False), ({"b", "c"}, False), ({"c"}, False), (set(), True)
+    ]
+    assert grammar.first_of_suffix(Rule("A", ("B", "B")), 0) == (("b",), True)
+
+
 def test_ll1_table_generation():
     rules = [
         ("E", ("T", "E'")),
@@ -173,3 +200,92 @@ def test_lalr_table_generation():
     actions, gotos = Grammar(rules).construct_lalr_parsing_table()
     assert actions == expected_action_table
     assert gotos == expected_goto_table
+
+
+def test_clr_state_numbering():
+    rules = [
+        ("sum", ("product",)),
+        ("sum", ("sum", "+", "product")),
+        ("sum", ("sum", "-", "product")),
+        ("product", ("factor",)),
+        ("product", ("product", "*", "factor")),
+        ("product", ("product", "/", "factor")),
+        ("factor", ("(", "sum", ")")),
+        ("factor", ("number",)),
+    ]
+    expected_shifts = {
+        (0, "("): 4, (0, "number"): 5, (1, "+"): 6, (1, "-"): 7, (2, "*"): 8, (2, "/"): 9,
+        (4, "("): 13, (4, "number"): 14, (6, "("): 4, (6, "number"): 5, (7, "("): 4,
+        (7, "number"): 5, (8, "("): 4, (8, "number"): 5, (9, "("): 4, (9, "number"): 5,
+        (10, ")"): 21, (10, "+"): 19, (10, "-"): 20, (11, "*"): 22, (11, "/"): 23,
+        (13, "("): 13, (13, "number"): 14, (15, "*"): 8, (15, "/"): 9, (16, "*"): 8,
+        (16, "/"): 9, (19, "("): 13, (19, "number"): 14, (20, "("): 13, (20, "number"): 14,
+        (22, "("): 13, (22, "number"): 14, (23, "("): 13, (23, "number"): 14, (24, ")"): 29,
+        (24, "+"): 19, (24, "-"): 20, (25, "*"): 22, (25, "/"): 23, (26, "*"): 22, (26, "/"): 23,
+    }
+    expected_goto_table = {
+        (0, "sum"): 1, (0, "product"): 2, (0, "factor"): 3, (4, "sum"): 10, (4, "product"): 11,
+        (4, "factor"): 12, (6, "product"): 15, (6, "factor"): 3, (7, "product"): 16,
+        (7, "factor"): 3, (8, "factor"): 17, (9, "factor"): 18, (13, "sum"): 24,
+        (13, "product"): 11, (13, "factor"): 12, (19, "product"): 25, (19, "factor"): 12,
+        (20, "product"): 26, (20, "factor"): 12, (22, "factor"): 27, (23, "factor"): 28,
+    }
+    actions, gotos = Grammar(rules).construct_clr_parsing_table()
+    assert {k: a[1] for k, a in actions.items() if a[0] == "shift"} == expected_shifts
+    assert gotos == expected_goto_table
+
+
+def test_lalr_lookaheads_beyond_slr():
+    rules = [
+        ("S", ("L", "=", "R")),
+        ("S", ("R",)),
+        ("L", ("*", "R")),
+        ("L", ("id",)),
+        ("R", ("L",)),
+    ]
+    with pytest.raises(AssertionError):
+        Grammar(rules).construct_slr_parsing_table()
+    actions, gotos = Grammar(rules).construct_lalr_parsing_table()
+    reductions = {k: a[1] for k, a in actions.items() if a[0] == "reduce"}
+    assert {(i, t) for i, t in reductions if reductions[i, t] == ("R", ("L",))} == {
+        (2, None), (7, "="), (7, None),
+    }
+    assert len({state for state, _ in actions} | set(gotos.values())) == 10
+
+
+def test_pager_table_generation():
+    rules = [
+        ("S", ("a", "E", "c")),
+        ("S", ("a", "F", "d")),
+        ("S", ("b", "F", "c")),
+        ("S", ("b", "E", "d")),
+        ("E", ("e",)),
+        ("F", ("e",)),
+    ]
+    with pytest.raises(AssertionError):
+        Grammar(rules).construct_lalr_parsing_table()
+    actions, gotos = Grammar(rules).construct_pager_parsing_table()
+    assert len({state for state, _ in actions}) == 14
+    clr_actions, _ = Grammar(rules).construct_clr_parsing_table()
+    assert len(actions) == len(clr_actions)
+
+
+def test_pager_merges_like_lalr():
+    rules = [("S", ("C", "C")), ("C", ("c", "C")), ("C", ("d",))]
+    assert Grammar(rules).construct_pager_parsing_table() == (
+        Grammar(rules).construct_lalr_parsing_table()
+    )
+
+
+def test_int_items():
+    grammar = Grammar([("S", ("C", "C")), ("C", ("c", "C")), ("C", ("d",))])
+    root = grammar.item(0)
+    assert grammar.item_parts(root) == (Rule(None, ("S",)), 0, None)
+    assert grammar.item_parts(grammar.item(2, 1, "d")) == (Rule("C", ("c", "C")), 1, "d")
+    assert {grammar.item_parts(item) for item in grammar.lr1_closure([root])} == {
+        (Rule(None, ("S",)), 0, None), (Rule("S", ("C", "C")), 0, None),
+        (Rule("C", ("c", "C")), 0, "c"), (Rule("C", ("c", "C")), 0, "d"),
+        (Rule("C", ("d",)), 0, "c"), (Rule("C", ("d",)), 0, "d"),
+    }
+    (symbol, kernel), *_ = grammar.goto_kernels(grammar.lr0_closure([root]))
+    assert symbol == "S" and kernel == (grammar.item(0, 1),)
@@ -0,0 +1,39 @@
+from handwritten_things.handwritten_tokenizer import Tokens, keyword_trie, parse, parse_keyword
+
+KEYWORDS = {"if", "in", "int", "=", "==", "=>", "+", "+="}
+
+
+def test_longest_keyword():
+    trie = keyword_trie(KEYWORDS)
+    assert keyword_trie(trie) is trie
+    assert parse_keyword("int x", trie) == ((Tokens.keyword, "int"), 3)
+    assert parse_keyword("inx", trie) == ((Tokens.keyword, "in"), 2)
+    assert parse_keyword("x == 1", trie, 2) == ((Tokens.keyword, "=="), 4)
+    assert parse_keyword("x", trie) == (None, 0)
+    tokens = parse("if x==1 => y += 2", trie)
+    assert [t for t, _ in tokens] == [
+        Tokens.keyword, Tokens.identifier, Tokens.keyword, Tokens.number,
+        Tokens.keyword, Tokens.identifier, Tokens.keyword, Tokens.number,
+    ]
+    assert [v for _, v in tokens] == ["if", "x", "==", "1", "=>", "y", "+=", "2"]
+
+
+def test_keywords_and_identifiers():
+    # the longest token wins, a keyword wins over an identifier of the same length
+    assert parse("in int index", KEYWORDS) == [
+        (Tokens.keyword, "in"), (Tokens.keyword, "int"), (Tokens.identifier, "index")
+    ]
+
+
+def test_unexpected_characters():
+    assert parse("a @@ b", KEYWORDS) is None
+    assert parse("a @@ b\nc", KEYWORDS, recover=True) == [
+        (Tokens.identifier, "a"), (Tokens.error, "@@"), (Tokens.identifier, "b"),
+        (Tokens.newline, "\n"), (Tokens.identifier, "c"),
+    ]
+    # scanning resumes at the first character that starts a token
+    assert parse("x@?1 ?in", KEYWORDS, recover=True) == [
+        (Tokens.identifier, "x"), (Tokens.error, "@?"), (Tokens.number, "1"),
+        (Tokens.error, "?"), (Tokens.keyword, "in"),
+    ]
+    assert parse("@", KEYWORDS, recover=True) == [(Tokens.error, "@")]
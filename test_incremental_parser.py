@@ -0,0 +1,112 @@
+from re import compile as re
+from compact_table import CompactTable
+from ebnf import EBNF
+from grammar import Grammar
+from incremental_parser import IncrementalParser
+import pytest
+
+RULES = {
+    ("sum", ("product",)): (lambda x: x),
+    ("sum", ("sum", "+", "product")): (lambda x, _, y: ("+", x, y)),
+    ("product", ("factor",)): (lambda x: x),
+    ("product", ("product", "*", "factor")): (lambda x, _, y: ("*", x, y)),
+    ("factor", ("(", "sum", ")")): (lambda _, x, __: ("()", x)),
+    ("factor", ("number",)): (lambda x: x),
+}
+PATTERNS = {
+    re(r"\s+"): None,
+    re(r"[-+*()]"): lambda span, s: (s, s),
+    re(r"\d+"): lambda span, s: ("number", (span, int(s))),
+}
+
+
+def full_parse(table, text):
+    parser = IncrementalParser(table, RULES, PATTERNS)
+    parser.reset(text)
+    return parser.value()
+
+
+@pytest.mark.parametrize("algorithm", ["slr", "lalr", "clr"])
+def test_edits(algorithm):
+    table = CompactTable(*getattr(Grammar(RULES), f"construct_{algorithm}_parsing_table")())
+    parser = IncrementalParser(table, RULES, PATTERNS)
+    text = "1 + 2 * (3 + 4) * 5 + 6"
+    parser.reset(text)
+    assert parser.value() == full_parse(table, text)
+    edits = [
+        ("1", "10"), ("+ 2", "* 2"), ("(3", "(  3"), ("6", "(7 + 8)"), ("4)", "4 * 9)"),
+        ("", "(1) + "), ("5", "50"), ("* 2 *", "* (2 + 1) *"), ("(7 + 8)", "7"),
+    ]
+    for old_text, new_text in edits:
+        start = text.index(old_text)
+        end = start + len(old_text)
+        text = text[:start] + new_text + text[end:]
+        parser.edit(start, end, new_text)
+        assert parser.text == text
+        assert parser.value() == full_parse(table, text)
+
+
+def test_unchanged_subtrees_are_reused():
+    table = CompactTable(*Grammar(RULES).construct_lalr_parsing_table())
+    parser = IncrementalParser(table, RULES, PATTERNS)
+    parser.reset("(1 + 2) * (3 + 4) + (5 + 6) + 7")
+    old_children = parser.root.children[0].children[0].children[0].children
+    old_right_product = parser.root.children[0].children[2]
+    parser.edit(15, 16, "30")
+    assert parser.text == "(1 + 2) * (3 + 30) + (5 + 6) + 7"
+    new_children = parser.root.children[0].children[0].children[0].children
+    assert old_children[0] is new_children[0] and old_children[1] is new_children[1]
+    assert old_children[2] is not new_children[2]
+    assert parser.root.children[0].children[2] is old_right_product
+
+
+def test_errors():
+    table = CompactTable(*Grammar(RULES).construct_lalr_parsing_table())
+    parser = IncrementalParser(table, RULES, PATTERNS)
+    parser.reset("1 + 2")
+    with pytest.raises(ValueError):
+        parser.edit(4, 5, "")
+    with pytest.raises(ValueError):
+        parser.edit(4, 4, "-")
+    parser.edit(4, 5, "3")
+    assert parser.value() == full_parse(table, "1 + 3")
+    # an edit that cannot be scanned drops the tree, later edits do not reuse it
+    parser.reset("1 + 2 * 3")
+    with pytest.raises(ValueError):
+        parser.edit(4, 4, "$")
+    with pytest.raises(ValueError):
+        parser.value()
+    with pytest.raises(ValueError):
+        parser.edit(9, 10, "4")  # the text still has the "$"
+    parser.edit(4, 5, "")
+    assert parser.text == "1 + 2 * 4" and parser.value() == full_parse(table, "1 + 2 * 4")
+
+
+def test_ebnf_incremental_parser():
+    ebnf = EBNF("""
+        sum = product | sum, "+", product | sum, "-", product;
+        product = factor | product, "*", factor | product, "/", factor;
+        factor = "(", sum, ")" | number;
+        number = ?\\d+?;
+    """)
+    parser = ebnf.incremental_parser()
+    parser.reset("2+2*(3-1)")
+    assert parser.value() == ebnf.parse("2+2*(3-1)")
+    parser.edit(5, 6, "30/6")
+    assert parser.value() == ebnf.parse("2+2*(30/6-1)")
+
+
+def test_repetitions_are_reused():
+    # a repetition starts with the reduction of its empty rule, the spine is still shifted whole
+    ebnf = EBNF("""
+        rules = {rule};
+        rule = name, "=", name, ";";
+        name = ?[a-z]+?;
+    """)
+    parser = ebnf.incremental_parser()
+    parser.reset("a=b;" * 50)
+    spine = parser.root.children[0].children[0].children[0]
+    parser.edit(198, 199, "c")
+    assert parser.text == "a=b;" * 49 + "a=c;"
+    assert parser.root.children[0].children[0].children[0] is spine
+    assert parser.value() == ebnf.parse(parser.text)
@@ -0,0 +1,54 @@
+from clr_parser import PushParser, parse
+from grammar import Grammar
+from lazy_table import LazyTable
+import pytest
+
+RULES = {
+    ("sum", ("product",)): (lambda x: x),
+    ("sum", ("sum", "+", "product")): (lambda x, _, y: x + y),
+    ("product", ("factor",)): (lambda x: x),
+    ("product", ("product", "*", "factor")): (lambda x, _, y: x * y),
+    ("factor", ("(", "sum", ")")): (lambda *x: x[1]),
+    ("factor", ("number",)): (lambda x: x),
+}
+
+
+def scan(source):
+    return [("number", int(w)) if w.isdigit() else (w, w) for w in source.split()]
+
+
+@pytest.mark.parametrize("algorithm", ["slr", "clr"])
+def test_lazy_parsing(algorithm):
+    table = LazyTable(RULES, algorithm)
+    assert not table.actions and not table.gotos
+    assert parse(table, None, RULES, scan("2 + 3")) == 5
+    states = len(table.actions)
+    actions, _ = getattr(Grammar(RULES), f"construct_{algorithm}_parsing_table")()
+    assert states < 1 + max(state for state, _ in actions)  # parentheses were never reached
+    assert parse(table, None, RULES, scan("2 * ( 3 + 4 ) + 5")) == 19
+    assert len(table.actions) > states
+    with pytest.raises(ValueError):
+        parse(table, None, RULES, scan("2 + + 3"))
+
+
+def test_conflicts_are_found_when_reached():
+    rules = [("S", ("a", "E")), ("S", ("b",)), ("E", ("E", "+", "E")), ("E", ("n",))]
+    table = LazyTable(rules)
+    assert parse(table, None, {}, [("b", "b")]) == ("S", "b")
+    with pytest.raises(AssertionError):
+        parse(table, None, {}, [("a", "a"), ("n", 1), ("+", "+"), ("n", 2), ("+", "+")])
+
+
+def test_saved_states(tmp_path, monkeypatch):
+    from table_cache import cached_lazy_table, save_lazy_table
+    monkeypatch.setenv("GRAMMAR_CACHE_DIR", str(tmp_path))
+    table = cached_lazy_table(list(RULES))
+    parser = PushParser(table, None, RULES)
+    parser.feed(scan("1 + 2"))
+    assert parser.close() == 3
+    save_lazy_table(table)
+    loaded = cached_lazy_table(list(RULES))
+    assert loaded.actions == table.actions and loaded.gotos == table.gotos
+    assert list(loaded.kernels) == list(table.kernels)
+    assert parse(loaded, None, RULES, scan("( 1 + 2 ) * 3")) == 9
+    assert cached_lazy_table(list(RULES), "slr").actions == {}
@@ -1,8 +1,11 @@
-from re import compile as re
+from mmap import ACCESS_READ, mmap
+from re import IGNORECASE, compile as re
 
 import pytest
 
-from lexer import construct_lexer, get_very_simple_lexer
+from lexer import (
+    PushLexer, compile_patterns, construct_array_lexer, construct_lexer, get_very_simple_lexer
+)
 
 
 @pytest.mark.parametrize("expr, tokens", [
@@ -21,6 +24,7 @@ from lexer import construct_lexer, get_very_simple_lexer
 def test_very_simple_lexer(expr, tokens):
     scan = get_very_simple_lexer("+-*/()")
     assert list(scan(expr)) == tokens + [(None, None)]
+    assert list(scan(memoryview(expr.encode()))) == tokens + [(None, None)]
 
 
 @pytest.mark.parametrize("expr, tokens", [
@@ -44,3 +48,115 @@ def test_scanner(expr, tokens):
         re(r"\w+(\s+\w+)*"): lambda _, s: ("identifier", s),
     })
     assert list(scan(expr)) == tokens
+    assert list(scan(expr.encode())) == tokens
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 100])
+def test_push_lexer(chunk_size):
+    patterns = {
+        re(r"\s+"): None,
+        re(r"[-+*/()]"): lambda span, s: (s, span),
+        re(r"\d+"): lambda span, s: ("number", span),
+        re(r"\w+(\s+\w+)*"): lambda span, s: ("identifier", span),
+    }
+    source = "d y/d x(5) + 123 * (var x + variable y)  "
+    lexer = PushLexer(patterns)
+    tokens = []
+    for i in range(0, len(source), chunk_size):
+        tokens += lexer.feed(source[i:i + chunk_size])
+    assert tokens + lexer.close() == list(construct_lexer(patterns)(source))
+    lexer = PushLexer(patterns)
+    lexer.feed("2 + $")
+    with pytest.raises(ValueError):
+        lexer.close()
+
+
+@pytest.mark.parametrize("patterns", [
+    {"if": "keyword", "i": "letter", re(r"\w+"): "word", "=": "=", "==": "==", re(r"\s+"): None},
+    {re(r"\w+"): "word", "if": "keyword", re(r"=+"): "=", re(r"\s+"): None},
+    {re(r"(\w)\1"): "double", re(r"\w"): "letter", re(r"[ =]+"): None},
+    {re(r"IF", IGNORECASE): "keyword", re(r"(?P<x>\w)(?P=x)?"): "letter", re(r"[ =]+"): None},
+])
+def test_first_match_priority(patterns):
+    # the combined lexer finds the same tokens as trying every pattern in order
+    source, expected, i = "if iff == i if= ifif aab iFx", [], 0
+    recognizers = compile_patterns(patterns)
+    while i < len(source):
+        match, token = next((m, t) for r, t in recognizers if (m := r.match(source, i)))
+        if token is not None:
+            expected.append((token, match.span(), match[0]))
+        i = match.end()
+    lexer = construct_lexer({
+        pattern: token and (lambda span, text, token=token: (token, span, text))
+        for pattern, token in patterns.items()
+    })
+    assert list(lexer(source)) == expected
+
+
+def test_token_array():
+    patterns = {re(r"\s+"): None, re(r"\d+"): "number", "+": "+", "*": "*"}
+    scan = construct_array_lexer(patterns, {"number": lambda span, text: int(text)})
+    tokens = scan("12 + 3*45")
+    assert list(tokens.types) == [0, 1, 0, 2, 0] and tokens.type_names == ["number", "+", "*"]
+    assert list(zip(tokens.starts, tokens.ends)) == [(0, 2), (3, 4), (5, 6), (6, 7), (7, 9)]
+    assert (tokens.token_type(4), tokens.text(4), tokens.value(4)) == ("number", "45", 45)
+    assert list(tokens) == [("number", 12), ("+", "+"), ("number", 3), ("*", "*"), ("number", 45)]
+    assert len(scan("1 2", 1)) == 1
+    with pytest.raises(ValueError):
+        scan("1 - 2")
+    # a backreference cannot be combined with other patterns, the patterns are tried in order
+    scan = construct_array_lexer({re(r"(\d)\1"): "double", re(r"\d"): "digit", " ": None})
+    assert list(scan("11 12")) == [("double", "11"), ("digit", "1"), ("digit", "2")]
+
+
+def test_bytes_like_sources(tmp_path):
+    # offsets are byte offsets, character classes only match ASCII characters in bytes
+    patterns = {re(r"\s+"): None, re(r"\d+"): "number", "→": "arrow", re(r"\w+"): "name"}
+    scan = construct_array_lexer(patterns, {"number": lambda span, text: (span, int(text))})
+    scan_spans = construct_lexer({
+        pattern: token_type and (lambda span, text, token_type=token_type: (token_type, span))
+        for pattern, token_type in patterns.items()
+    })
+    path = tmp_path.joinpath("source.txt")
+    path.write_text("x → 12 → y", encoding="utf-8")
+    with path.open("rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as source:
+        tokens = scan(source)
+        assert list(tokens) == [
+            ("name", "x"), ("arrow", "→"), ("number", ((6, 8), 12)), ("arrow", "→"),
+            ("name", "y"),
+        ]
+        assert tokens.text(3) == "→" and list(tokens.starts) == [0, 2, 6, 9, 13]
+        assert list(scan_spans(source)) == [
+            ("name", (0, 1)), ("arrow", (2, 5)), ("number", (6, 8)), ("arrow", (9, 12)),
+            ("name", (13, 14)),
+        ]
+    with pytest.raises(ValueError, match=r"Unexpected character: b'\$'"):
+        scan(b"x $")
+    # non-ASCII characters only in literal text, tokens must be whole UTF-8 characters
+    with pytest.raises(ValueError, match="non-ASCII"):
+        construct_lexer({re(r"[äö]"): lambda span, text: text, re(r"\s+"): None})("ä ö".encode())
+    with pytest.raises(ValueError, match=r"Unexpected character: b'\\xc3'"):
+        list(construct_lexer({re(r"."): lambda span, text: text})("ä".encode()))
+
+
+@pytest.mark.parametrize("number", [re(r"\d+"), re(r"(\d)\1|\d+")])
+def test_error_recovery(number):
+    # unexpected text up to the next token start becomes one error token
+    patterns = {re(r"\s+"): None, number: "number", "++": "++", "+": "+"}
+    source, error = "1 $$+ 2 @ ++ 3!", lambda span, text: ("error", (span, text))
+    expected = [
+        ("number", "1"), ("error", ((2, 4), "$$")), ("+", "+"), ("number", "2"),
+        ("error", ((8, 9), "@")), ("++", "++"), ("number", "3"), ("error", ((14, 15), "!")),
+    ]
+    scan = construct_lexer({
+        pattern: token_type and (lambda span, text, token_type=token_type: (token_type, text))
+        for pattern, token_type in patterns.items()
+    }, on_error=error)
+    assert list(scan(source)) == expected
+    assert list(scan(source.encode())) == expected
+    scan_array = construct_array_lexer(patterns, {"error": lambda *error: error}, "error")
+    assert list(scan_array(source)) == expected
+    assert list(get_very_simple_lexer("+", on_error=error)("1 $$+ a@b")) == [
+        ("number", 1), ("error", ((2, 4), "$$")), ("+", "+"), ("identifier", "a"),
+        ("error", ((7, 8), "@")), ("identifier", "b"), (None, None),
+    ]
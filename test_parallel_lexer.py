@@ -0,0 +1,45 @@
+from re import compile as re
+import pytest
+from lexer import construct_array_lexer
+from parallel_lexer import chunk_bounds, scan_file
+
+PATTERNS = {
+    re(r"\s+"): None,
+    re(r'"[^"]*"'): "string",
+    re(r"#[^\n]*"): "comment",
+    re(r"\d+"): "number",
+    re(r"\w+"): "name",
+    re(r"[=+]"): "operator",
+}
+
+
+def test_chunk_bounds():
+    assert chunk_bounds(b"ab\ncd\nef\n", 1) == [0, 3, 6, 9]
+    assert chunk_bounds(b"ab\ncd\nef", 4) == [0, 6, 8]
+    assert chunk_bounds(b"abc", 1) == [0, 3]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 16, 1000])
+def test_scan_file(tmp_path, chunk_size):
+    # strings and comments cross the lines where chunks start
+    source = 'x = 1 + "a\nb = 2\n" # c\nd = "\n" + 3\ny\n' * 20 + 'z = "é"\n'
+    path = tmp_path.joinpath("source.txt")
+    path.write_text(source, encoding="utf-8")
+    values = {"number": lambda span, text: int(text)}
+    expected = construct_array_lexer(PATTERNS, values)(source.encode())
+    tokens = scan_file(PATTERNS, path, values, processes=2, chunk_size=chunk_size)
+    assert list(tokens) == list(expected)
+    assert (tokens.starts, tokens.ends) == (expected.starts, expected.ends)
+    assert tokens.end == expected.end == len(source.encode())
+
+
+def test_errors_and_empty_files(tmp_path):
+    path = tmp_path.joinpath("source.txt")
+    path.write_text("")
+    assert len(scan_file(PATTERNS, path, processes=2)) == 0
+    path.write_text("a = 1\n" * 10 + "$\n" + "b = 2\n" * 10 + "$$")
+    with pytest.raises(ValueError):
+        scan_file(PATTERNS, path, processes=2, chunk_size=8)
+    tokens = scan_file(PATTERNS, path, processes=2, chunk_size=8, error_type="error")
+    errors = [i for i in range(len(tokens)) if tokens.token_type(i) == "error"]
+    assert [(tokens.starts[i], tokens.text(i)) for i in errors] == [(60, "$"), (122, "$$")]
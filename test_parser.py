@@ -1,4 +1,4 @@
-from parser import lr_parser
+from parser import lr_parser, lr_table
 import pytest
 
 evaluate = lr_parser({
@@ -19,6 +19,36 @@ def test_simplest_case():
     assert ast == ("S", ("C", (0, "c"), ("C", (1, "d"))), ("C", (2, "d")))
 
 
+def test_lr1_grammar_with_lalr_conflicts():
+    parse = lr_parser([
+        ("S", ("a", "E", "c")),
+        ("S", ("a", "F", "d")),
+        ("S", ("b", "F", "c")),
+        ("S", ("b", "E", "d")),
+        ("E", ("e",)),
+        ("F", ("e",)),
+    ])
+    assert parse([(c, c) for c in "aed"]) == ("S", "a", ("F", "e"), "d")
+    assert parse([(c, c) for c in "bed"]) == ("S", "b", ("E", "e"), "d")
+
+
+def test_table_of_rules_from_a_generator():
+    # SLR and LALR have conflicts, Pager's method is tried after them on the same rules
+    rules = [
+        ("S", ("a", "E", "c")), ("S", ("a", "F", "d")), ("S", ("b", "F", "c")),
+        ("S", ("b", "E", "d")), ("E", ("e",)), ("F", ("e",)),
+    ]
+    assert lr_table(rule for rule in rules).rules[1:] == lr_table(rules).rules[1:]
+
+
+def test_ambiguous_grammar():
+    parse = lr_parser({
+        ("expr", ("expr", "+", "expr")): (lambda x, _, y: x + y),
+        ("expr", ("number",)): (lambda x: x),
+    })
+    assert parse([("number", 1), ("+", "+"), ("number", 2), ("+", "+"), ("number", 3)]) == 6
+
+
 ARITHMETIC_EXPRESSIONS = [
     "1 + 16 * 0 * 880 / 7 - 23 + 6 - 4 / 6 * 9 / 7 + 201 * 798 / 73 * 2 - 911",
     "38 - 4785 * 58 * 8 * 527 + 9 / 78 * 2 / 4 + 494 * 8 + 4 - 62 - 39 + 8337",
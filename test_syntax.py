@@ -1,4 +1,7 @@
-from syntax import Syntax, Rule
+import gc
+from re import compile as compile_re
+import pytest
+from syntax import Node, Rule, Syntax, literal_scanner
 
 
 def test_prefixes():
@@ -76,3 +79,56 @@ def test_rule_parsing():
     actions, gotos = Syntax(rules).get_clr_parsing_table(root_node="S")
     assert actions == expected_action_table
     assert gotos == expected_goto_table
+
+
+def test_longest_literal():
+    syntax = Syntax({"S a S": None, "S a = b": None, "S ab": None, "S": None}, {"==": None})
+    assert syntax.literals == {"a", "=", "b", "ab", "=="}
+    assert syntax.parse("aab", "S").value[2].value[1].value == "ab"
+    assert syntax.tokens["=="]("a==b", 1) == 2 and syntax.tokens["=="]("a==b", 2) == 0
+
+
+def test_context_aware_parsing():
+    # keywords are names where no keyword is expected
+    name = compile_re(r"[a-z]\w*")
+    rules = {
+        "S if E then S": lambda _, condition, __, statement: ("if", condition, statement.value),
+        "S name = E": lambda target, _, value: ("set", target.value, value.value),
+        "E name": lambda x: x.value,
+        "E ( )": lambda _, __: None,
+    }
+    syntax = Syntax(rules, {"name": lambda s, i: m.end() - i if (m := name.match(s, i)) else 0})
+    tree = syntax.parse("if then then x = if", "S")
+    assert tree == Node((0, 19), ("if", Node((3, 7), "then"), ("set", "x", "if")))
+    assert syntax.parse(" iffy=()", "S") == Node((1, 8), ("set", "iffy", None))
+    for invalid_source in ["if x then", "x = ", "if x then y = 1"]:
+        with pytest.raises(ValueError):
+            syntax.parse(invalid_source, "S")
+    assert (literal_scanner("")("ab c", 0), literal_scanner("")("ab c", 2)) == (2, 0)
+
+
+def test_keywords_after_default_reductions():
+    # "if" follows X, but after "b X" only a word is valid
+    syntax = Syntax({"S X if": None, "S b X ": None, "X a": None})
+    assert syntax.parse("b a if", "S").value[3] == Node((4, 6), "if")
+    assert syntax.parse("a if", "S").value[2] == Node((2, 4), "if")
+    with pytest.raises(ValueError):
+        syntax.parse("b a if if", "S")
+    assert gc.isenabled()  # the collector is paused only while parsing
+
+
+def test_regular_expression_tokens():
+    # literals and patterns are tried at once, the longest token wins and literals win ties
+    syntax = Syntax({
+        "S name := E": lambda target, _, value: (target.value, value.value),
+        "S if E": lambda _, condition: ("if", condition.value),
+        "E name": lambda x: x.value,
+        "E number": lambda x: float(x.value),
+        "E E : name": lambda x, _, y: (x.value, y.value),
+    }, {"name": compile_re(r"[a-z]+"), "number": compile_re(r"(\d+)(\.\d+)?")})
+    assert syntax.parse("iffy := if", "S") == Node((0, 10), ("iffy", "if"))
+    assert syntax.parse("if if", "S") == Node((0, 5), ("if", "if"))
+    assert syntax.parse("if 1.5:x", "S") == Node((0, 8), ("if", (1.5, "x")))
+    for invalid_source in ["if := 2", "x := 1.", "x := ?"]:
+        with pytest.raises(ValueError):
+            syntax.parse(invalid_source, "S")
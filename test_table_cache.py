@@ -0,0 +1,57 @@
+import table_cache
+from table_cache import cached_table, fingerprint
+import pytest
+
+RULES = [
+    ("sum", ("product",)),
+    ("sum", ("sum", "+", "product")),
+    ("product", ("factor",)),
+    ("product", ("product", "*", "factor")),
+    ("factor", ("(", "sum", ")")),
+    ("factor", ("number",)),
+]
+AMBIGUOUS_RULES = [("E", ("E", "+", "E")), ("E", ("n",))]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("GRAMMAR_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_fingerprint():
+    assert fingerprint(RULES, "slr") == fingerprint(list(RULES), "slr")
+    assert fingerprint(RULES, "slr") != fingerprint(RULES, "lalr")
+    assert fingerprint(RULES, "slr") != fingerprint(RULES[::-1], "slr")
+    assert fingerprint(RULES, "slr") != fingerprint(RULES[:-1], "slr")
+
+
+def test_warm_start_skips_construction(cache_dir, monkeypatch):
+    table = cached_table(RULES, "lalr")
+    assert len(list(cache_dir.glob("*.table"))) == 1
+    monkeypatch.setattr(table_cache, "Grammar", None)
+    cached = cached_table(RULES, "lalr")
+    for name in table.__slots__:
+        assert getattr(cached, name) == getattr(table, name)
+
+
+def test_cached_conflict(cache_dir, monkeypatch):
+    with pytest.raises(AssertionError):
+        cached_table(AMBIGUOUS_RULES, "slr")
+    monkeypatch.setattr(table_cache, "Grammar", None)
+    with pytest.raises(AssertionError):
+        cached_table(AMBIGUOUS_RULES, "slr")
+
+
+def test_corrupted_cache_entry(cache_dir):
+    table = cached_table(RULES, "slr")
+    (path,) = cache_dir.glob("*.table")
+    path.write_bytes(b"\x00garbage")
+    assert cached_table(RULES, "slr").action_value == table.action_value
+    assert path.read_bytes() == table.to_bytes()
+
+
+def test_unwritable_cache(tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("GRAMMAR_CACHE_DIR", str(tmp_path / "file" / "cache"))
+    assert cached_table(RULES, "slr").rules == cached_table(RULES, "slr").rules